@@ -0,0 +1,76 @@
+# Benchmark: accumulating a list of dicts into one DataFrame vs streaming typed rows in batches.
+# Each mode runs in its own process so the peak memory (max RSS) of one does not hide the other.
+#   python benchmarks/bench_stream_parse.py --games 272
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+import nfl_core
+
+def iter_games(games, seed=7):
+    return fixtures.SyntheticSeason(games, seed=seed).iter_games()
+
+# Original approach: one dict per athlete per category, then one big DataFrame
+def run_dicts(games, path):
+    import pandas as pd
+
+    all_player_stats = []
+    for info, summary_data in iter_games(games):
+        for team in summary_data["boxscore"]["players"]:
+            for player in team["statistics"]:
+                for athlete in player["athletes"]:
+                    player_data = {
+                        "Game": f"{info['home_team']} vs {info['away_team']}",
+                        "Team": team["team"]["displayName"],
+                        "Category": player["name"],
+                        "Player": athlete["athlete"]["displayName"],
+                        "Home Team Score": info["home_score"],
+                        "Away Team Score": info["away_score"],
+                    }
+                    player_data.update(nfl_core.display_player_stats(player["name"], None, athlete["stats"]))
+                    all_player_stats.append(player_data)
+    df = pd.DataFrame(all_player_stats)
+    df.to_parquet(path, index=False)
+    return len(df)
+
+# Streaming approach: typed rows written in batches
+def run_stream(games, path, batch_size):
+    rows = (row for info, summary_data in iter_games(games) for row in nfl_core.iter_summary_rows(info, summary_data))
+    row_count, _ = nfl_core.write_stats_rows(rows, path, batch_size)
+    return row_count
+
+def run_mode(mode, games, batch_size):
+    # Import everything first so only the parsing itself counts towards the peak
+    import pandas  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    path = os.path.join(tempfile.mkdtemp(), "stats.parquet")
+    start = time.perf_counter()
+    row_count = run_dicts(games, path) if mode == "dicts" else run_stream(games, path, batch_size)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print(f"{mode:>7}: {row_count} rows in {elapsed:.2f}s, peak memory +{peak / 1024:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak memory of dict accumulation and streaming parsing.")
+    parser.add_argument("--games", type=int, default=272, help="Number of games (272 is a regular season)")
+    parser.add_argument("--batch-size", type=int, default=nfl_core.STATS_BATCH_SIZE)
+    parser.add_argument("--mode", choices=["dicts", "stream"], default=None)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.games, args.batch_size)
+        return
+    for mode in ("dicts", "stream"):
+        subprocess.run([sys.executable, __file__, "--mode", mode, "--games", str(args.games), "--batch-size", str(args.batch_size)], check=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+# Seeded synthetic fixtures shaped like the ESPN and Odds API responses, so benchmarks run offline.
+# The same seed always gives the same season: box scores, events and every bookmaker's prop lines.
+#   season = SyntheticSeason(games=272, bookmakers=10)
+#   session = season.session()  # answers the requests nfl_core makes, without a network
+import datetime
+import json
+import os
+import random
+import sys
+import zlib
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import nfl_core
+
+YEAR = 2024
+SEASONTYPE = 2
+GAMES_PER_WEEK = 16
+TEAMS = 32
+
+BOOKMAKERS = [
+    "DraftKings", "FanDuel", "BetMGM", "Caesars", "BetRivers", "ESPN BET", "Fanatics", "Bovada",
+    "BetOnline.ag", "MyBookie.ag", "LowVig.ag", "Unibet", "SuperBook", "WynnBET",
+]
+
+FIRST_NAMES = [
+    "Josh", "Patrick", "Lamar", "Jalen", "Justin", "Joe", "Tua", "Derrick", "Christian", "Saquon",
+    "Tyreek", "Travis", "Davante", "Stefon", "Amon-Ra", "CeeDee", "Mark", "George", "Kyle", "Isiah",
+]
+LAST_NAMES = [
+    "Allen", "Mahomes", "Jackson", "Hurts", "Herbert", "Burrow", "Smith", "Henry", "McCaffrey", "Barkley",
+    "Hill", "Kelce", "Adams", "Diggs", "St. Brown", "Lamb", "Andrews", "Kittle", "Pitts", "Pacheco",
+    "Brown", "Williams", "Johnson", "Jones", "Davis", "Moore", "Taylor", "Thomas", "Harris", "Walker",
+    "Robinson", "Jefferson", "Chase", "Olave", "Wilson", "Waddle", "Etienne", "Cook", "Mixon", "Pollard",
+    "Goff", "Stroud", "Love", "Prescott", "Purdy", "Tucker", "Bosa", "Parsons", "Garrett", "Watt",
+]
+
+# Roster slots per category. Slots shared between categories are the same player (e.g. the QB also runs).
+CATEGORY_SLOTS = {
+    "passing": ["QB"],
+    "rushing": ["RB1", "RB2", "QB", "RB3"],
+    "receiving": ["WR1", "WR2", "WR3", "TE1", "RB1", "WR4", "TE2", "RB2"],
+    "fumbles": ["QB", "RB1"],
+    "defensive": [f"DEF{i}" for i in range(1, 25)],
+    "interceptions": ["DEF3"],
+    "kickReturns": ["KR1", "KR2"],
+    "puntReturns": ["KR1"],
+    "kicking": ["K"],
+    "punting": ["P"],
+}
+ATHLETES_PER_CATEGORY = {category: len(slots) for category, slots in CATEGORY_SLOTS.items()}
+
+# Players each market is offered for
+MARKET_SLOTS = {
+    "player_pass_tds": ["QB"], "player_pass_attempts": ["QB"], "player_pass_completions": ["QB"],
+    "player_pass_interceptions": ["QB"], "player_rush_yds": ["RB1", "RB2", "QB"], "player_rush_attempts": ["RB1", "RB2", "QB"],
+    "player_rush_longest": ["RB1", "QB"], "player_receptions": ["WR1", "WR2", "WR3", "TE1", "RB1"],
+    "player_reception_yds": ["WR1", "WR2", "WR3", "TE1", "RB1"], "player_reception_longest": ["WR1", "WR2", "TE1"],
+}
+
+PRICES = (-135, -125, -120, -115, -110, -105, 100, 105, 110)
+
+# Typical ranges of the stats props are offered on, everything else is drawn from DEFAULT_INT_RANGE
+STAT_RANGES = {
+    "Passing Attempts": (18, 48), "Passing Yards": (120, 420), "Passing TDs": (0, 4), "Interceptions": (0, 2),
+    "Rushing Attempts": (1, 24), "Rushing Yards": (0, 140), "Longest Run": (0, 45),
+    "Receptions": (0, 11), "Receiving Yards": (0, 150), "Longest Reception": (0, 60), "Targets": (1, 14),
+}
+DEFAULT_INT_RANGE = (0, 12)
+
+# Function to format one athlete's stats the way ESPN does (strings, composites like "23/35")
+def format_stats(category, rng):
+    stats = []
+    values = {}
+    for columns, dtype, separator in nfl_core.STAT_SCHEMA[category]:
+        if separator:
+            low, high = STAT_RANGES.get(columns[1], (20, 45))
+            total = rng.randint(low, high)
+            made = rng.randint(0, total)
+            stats.append(f"{made}{separator}{total}")
+            values[columns[0]], values[columns[1]] = made, total
+        elif dtype == "float64":
+            value = round(rng.uniform(0, 20), 1)
+            stats.append(f"{value:.1f}")
+            values[columns[0]] = value
+        else:
+            value = rng.randint(*STAT_RANGES.get(columns[0], DEFAULT_INT_RANGE))
+            stats.append(str(value))
+            values[columns[0]] = value
+    return stats, values
+
+# Function to format a response body the way the real API sends it, so decoding is part of the work
+def to_body(data):
+    return json.dumps(data, separators=(",", ":"))
+
+class FixtureResponse:
+    def __init__(self, status_code, body="", headers=None):
+        self.status_code = status_code
+        self.text = body
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+# Stand-in for a requests session that serves a SyntheticSeason
+class FixtureSession:
+    def __init__(self, season, quota=100000):
+        self.season = season
+        self.quota = quota
+        self.requests = 0
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        self.requests += 1
+        parsed = urlparse(url)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        path = parsed.path.rstrip("/")
+
+        if path.endswith("/scoreboard"):
+            return self.espn_response(self.season.scoreboard(int(query["week"])), headers)
+        if path.endswith("/summary"):
+            return self.espn_response(self.season.summary(int(query["event"])), headers)
+        if path.endswith("/events"):
+            return self.odds_response(0, self.season.events())
+        if path.endswith("/odds"):
+            markets = (params or {}).get("markets", ",".join(nfl_core.ODDS_MARKETS)).split(",")
+            event_id = path.split("/")[-2]
+            return self.odds_response(len(markets), self.season.event_odds(int(event_id[2:]), markets))
+        return FixtureResponse(404, "Not Found")
+
+    # ESPN responses carry an ETag, a matching If-None-Match gets a 304 without a body
+    def espn_response(self, data, headers=None):
+        body = to_body(data)
+        etag = f'"{zlib.crc32(body.encode("utf-8")):08x}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return FixtureResponse(304, "", {"ETag": etag})
+        return FixtureResponse(200, body, {"ETag": etag})
+
+    def odds_response(self, cost, data):
+        self.quota -= cost
+        return FixtureResponse(200, to_body(data), {
+            "x-requests-remaining": str(self.quota), "x-requests-used": str(100000 - self.quota), "x-requests-last": str(cost),
+        })
+
+    def close(self):
+        pass
+
+class SyntheticSeason:
+    def __init__(self, games=272, bookmakers=10, seed=7, year=YEAR):
+        self.games = games
+        self.bookmakers = [BOOKMAKERS[i] if i < len(BOOKMAKERS) else f"Book {i + 1}" for i in range(bookmakers)]
+        self.seed = seed
+        self.year = year
+        self.weeks = list(range(1, (games - 1) // GAMES_PER_WEEK + 2))
+        self.teams = [self._team(number) for number in range(TEAMS)]
+
+    def _team(self, number):
+        rng = random.Random(f"{self.seed}-team-{number}")
+        slots = {slot for category_slots in CATEGORY_SLOTS.values() for slot in category_slots}
+        # Names are unique within a team, namesakes on other teams are common
+        names = set()
+        while len(names) < len(slots):
+            names.add(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+        roster = dict(zip(sorted(slots), sorted(names)))
+        return {"id": number, "name": f"Team {number + 1:02d} City", "short": f"T{number + 1:02d}", "roster": roster}
+
+    def session(self):
+        return FixtureSession(self)
+
+    # Function to save every response a run of stats and props for each week asks for to a transport archive.
+    # They are recorded as of the day before the first week, so every game is still upcoming for the props.
+    def record(self, path, seasontype=SEASONTYPE):
+        archive = nfl_core.TransportArchive(path)
+        recorded = (nfl_core.get_nfl_week_window(self.year, 1)[0] - datetime.timedelta(days=1)).timestamp()
+        session = self.session()
+        requests = [(f"{nfl_core.ESPN_BASE_URL}/scoreboard?dates={self.year}&seasontype={seasontype}&week={week}", None) for week in self.weeks]
+        requests += [(f"{nfl_core.ESPN_BASE_URL}/summary?event={game_id}", None) for game_id in range(self.games)]
+        requests.append((f"{nfl_core.ODDS_API_BASE_URL}/events/", None))
+        odds_params = {"regions": ",".join(nfl_core.ODDS_REGIONS), "markets": ",".join(nfl_core.ODDS_MARKETS), "oddsFormat": "american"}
+        requests += [(f"{nfl_core.ODDS_API_BASE_URL}/events/ev{game_id}/odds/", odds_params) for game_id in range(self.games)]
+        for url, params in requests:
+            response = session.get(url, params=params)
+            archive.add("GET", url, response.status_code, response.headers, response.text.encode("utf-8"), params=params, recorded=recorded)
+        archive.close()
+        return len(requests)
+
+    def week_of(self, game_id):
+        return game_id // GAMES_PER_WEEK + 1
+
+    def week_game_ids(self, week):
+        first = (week - 1) * GAMES_PER_WEEK
+        return list(range(first, min(first + GAMES_PER_WEEK, self.games)))
+
+    # Function to pair the teams of a game, a different pairing every week
+    def matchup(self, game_id):
+        week = self.week_of(game_id)
+        order = list(range(TEAMS))
+        random.Random(f"{self.seed}-week-{week}").shuffle(order)
+        slot = game_id % GAMES_PER_WEEK
+        return self.teams[order[2 * slot]], self.teams[order[2 * slot + 1]]
+
+    def kickoff(self, game_id):
+        start, _ = nfl_core.get_nfl_week_window(self.year, self.week_of(game_id))
+        return start + datetime.timedelta(days=5, hours=1 + game_id % 3 * 3)
+
+    # Function to generate a game's box score, the same one every time for the same seed
+    def box_score(self, game_id):
+        rng = random.Random(f"{self.seed}-game-{game_id}")
+        home, away = self.matchup(game_id)
+        teams = []
+        for team in (home, away):
+            categories = []
+            for category, slots in CATEGORY_SLOTS.items():
+                athletes = []
+                for slot in slots:
+                    stats, values = format_stats(category, rng)
+                    athletes.append((slot, stats, values))
+                categories.append((category, athletes))
+            teams.append((team, categories))
+        return teams
+
+    def scores(self, game_id):
+        rng = random.Random(f"{self.seed}-score-{game_id}")
+        return rng.randint(3, 42), rng.randint(3, 42)
+
+    def scoreboard(self, week):
+        events = []
+        for game_id in self.week_game_ids(week):
+            home, away = self.matchup(game_id)
+            home_score, away_score = self.scores(game_id)
+            competitors = [
+                {"homeAway": "home", "score": str(home_score), "team": {"displayName": home["name"], "shortDisplayName": home["short"]}},
+                {"homeAway": "away", "score": str(away_score), "team": {"displayName": away["name"], "shortDisplayName": away["short"]}},
+            ]
+            events.append({"id": str(game_id), "status": {"type": {"completed": True}}, "competitions": [{"competitors": competitors}]})
+        return {"events": events}
+
+    def summary(self, game_id):
+        teams = self.box_score(game_id)
+        players = []
+        for team, categories in teams:
+            statistics = []
+            for category, athletes in categories:
+                statistics.append({"name": category, "athletes": [
+                    {"athlete": {"id": f"{team['id']}-{slot}", "displayName": team["roster"][slot]}, "stats": stats}
+                    for slot, stats, _ in athletes
+                ]})
+            players.append({"team": {"displayName": team["name"]}, "statistics": statistics})
+        return {
+            "header": {"competitions": [{"status": {"type": {"completed": True}}}]},
+            "boxscore": {"players": players},
+        }
+
+    # Generator of (game info, summary) pairs, as get_nfl_week_stats sees them
+    def iter_games(self):
+        for week in self.weeks:
+            for info in nfl_core.get_game_infos(self.scoreboard(week)):
+                yield info, self.summary(int(info["id"]))
+
+    def events(self):
+        events = []
+        for game_id in range(self.games):
+            home, away = self.matchup(game_id)
+            kickoff = self.kickoff(game_id).strftime("%Y-%m-%dT%H:%M:%SZ")
+            events.append({"id": f"ev{game_id}", "commence_time": kickoff, "home_team": home["name"], "away_team": away["name"]})
+        return events
+
+    # Function to write a week's stats partition to path, as get_nfl_week_stats would, returns the rows written
+    def write_week_stats(self, week, path):
+        rows = (
+            row
+            for info, summary_data in zip(nfl_core.get_game_infos(self.scoreboard(week)), (self.summary(game_id) for game_id in self.week_game_ids(week)))
+            for row in nfl_core.iter_summary_rows(info, summary_data)
+        )
+        return nfl_core.write_stats_rows(rows, path)[0]
+
+    # Function to get a week's props as parse_player_props returns them, decoding the odds like a response
+    def week_props(self, week):
+        props = []
+        for game_id in self.week_game_ids(week):
+            props.extend(nfl_core.parse_player_props(json.loads(to_body(self.event_odds(game_id)))))
+        return props
+
+    # Function to generate every bookmaker's player props of a game, with lines near the final stats
+    def event_odds(self, game_id, markets=None):
+        markets = markets or nfl_core.ODDS_MARKETS
+        rng = random.Random(f"{self.seed}-odds-{game_id}")
+        teams = self.box_score(game_id)
+        actuals = {}
+        for team, categories in teams:
+            for category, athletes in categories:
+                for slot, _, values in athletes:
+                    actuals.setdefault((team["id"], slot), {}).update(values)
+
+        offers = []
+        for market in markets:
+            stat = nfl_core.STAT_MAPPING.get(market)
+            for team, _ in teams:
+                for slot in MARKET_SLOTS.get(market, []):
+                    # A few names are spelled differently by the books, as in the real feed
+                    name = team["roster"][slot]
+                    if rng.random() < 0.05:
+                        name += " Jr."
+                    line = actuals[(team["id"], slot)].get(stat, 0) + rng.choice((-3, -1.5, -0.5, 0.5, 1.5, 3))
+                    offers.append((market, name, max(0.5, float(line))))
+
+        bookmakers = []
+        for title in self.bookmakers:
+            markets_by_key = {}
+            for market, name, line in offers:
+                book_line = line + rng.choice((0, 0, 0, -1, 1))
+                over_price = rng.choice(PRICES)
+                under_price = rng.choice(PRICES)
+                markets_by_key.setdefault(market, []).extend([
+                    {"name": "Over", "description": name, "price": over_price, "point": max(0.5, book_line)},
+                    {"name": "Under", "description": name, "price": under_price, "point": max(0.5, book_line)},
+                ])
+            bookmakers.append({
+                "key": title.lower().replace(" ", "").replace(".", ""), "title": title,
+                "markets": [{"key": key, "outcomes": outcomes} for key, outcomes in markets_by_key.items()],
+            })
+        home, away = self.matchup(game_id)
+        return {"id": f"ev{game_id}", "home_team": home["name"], "away_team": away["name"], "bookmakers": bookmakers}
@@ -0,0 +1,310 @@
+# Benchmark suite: times parsing, comparison and every export path on synthetic seasons, fully offline.
+# Each case runs in its own process so its peak memory (max RSS) is measured on its own.
+#   python benchmarks/run_benchmarks.py --games 1,16,272 --bookmakers 10 --save benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json  # exits with 1 on a regression
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+import nfl_core
+
+DEFAULT_GAMES = "1,16,272"
+DEFAULT_BOOKMAKERS = 10
+DEFAULT_THRESHOLD = 0.10  # Slowdowns or memory growth above 10% count as regressions
+MIN_PEAK_MB = 1.0  # Peaks below this are too noisy to compare
+
+# Function to make any accidental network access fail loudly instead of touching a real API
+def block_network():
+    def refuse(*args, **kwargs):
+        raise RuntimeError("Benchmarks run offline, network access is not allowed")
+    socket.socket.connect = refuse
+    socket.create_connection = refuse
+
+# Function to build the inputs of the later stages, outside of the timed part
+def load_week_inputs(season, workdir):
+    import pandas as pd
+
+    inputs = []
+    for week in season.weeks:
+        path = os.path.join(workdir, f"stats_week_{week}.parquet")
+        season.write_week_stats(week, path)
+        stats_data = nfl_core.read_partition(path)
+        props = season.week_props(week)
+        inputs.append((week, stats_data, props, pd.DataFrame(props, columns=nfl_core.PROPS_COLUMNS)))
+    return inputs
+
+# Each case gets the season and a scratch directory, does its setup and returns the function to time.
+# The timed function returns the number of rows it handled.
+def case_week_stats(season, workdir):
+    nfl_core.CACHE_ENABLED = False
+
+    def run():
+        session = season.session()
+        rows = 0
+        for week in season.weeks:
+            result = nfl_core.get_nfl_week_stats(season.year, week, fixtures.SEASONTYPE, session=session, data_dir=workdir, export_excel=False)
+            rows += result["rows"]
+        return rows
+    return run
+
+def case_parse_stats(season, workdir):
+    games = [(info, json.loads(fixtures.to_body(summary_data))) for info, summary_data in season.iter_games()]
+
+    def run():
+        rows = (row for info, summary_data in games for row in nfl_core.iter_summary_rows(info, summary_data))
+        return nfl_core.write_stats_rows(rows, os.path.join(workdir, "stats.parquet"))[0]
+    return run
+
+def case_parse_props(season, workdir):
+    payloads = [json.loads(fixtures.to_body(season.event_odds(game_id))) for game_id in range(season.games)]
+
+    # Kept together like fetch_nfl_player_props does
+    def run():
+        all_props = []
+        for odds_data in payloads:
+            all_props.extend(nfl_core.parse_player_props(odds_data))
+        return len(all_props)
+    return run
+
+def case_props_snapshot(season, workdir):
+    props = [prop for week in season.weeks for prop in season.week_props(week)]
+
+    # Each run records into an empty history, otherwise later runs would find nothing changed
+    def run():
+        nfl_core.save_props_snapshot(props, tempfile.mkdtemp(dir=workdir), year=season.year, week=1)
+        return len(props)
+    return run
+
+def case_consensus_prices(season, workdir):
+    import pandas as pd
+
+    props = nfl_core.type_props_frame(pd.DataFrame([prop for week in season.weeks for prop in season.week_props(week)], columns=nfl_core.PROPS_COLUMNS))
+
+    def run():
+        nfl_core.consensus_prices(props)
+        return len(props)
+    return run
+
+# The whole pipeline (stats, props and comparison of every week) replayed from a recorded archive,
+# so the requests cost no time and what is left is parsing, storing and comparing
+def case_replay_pipeline(season, workdir):
+    archive = os.path.join(workdir, "transport.sqlite3")
+    season.record(archive)
+    nfl_core.TRANSPORT_MODE = "replay"
+    nfl_core.TRANSPORT_ARCHIVE = archive
+
+    def run():
+        data_dir = tempfile.mkdtemp(dir=workdir)
+        rows = 0
+        for week in season.weeks:
+            nfl_core.get_nfl_week_stats(season.year, week, fixtures.SEASONTYPE, data_dir=data_dir, export_excel=False)
+            nfl_core.download_week_props(season.year, week, data_dir=data_dir, export_excel=False)
+            rows += len(nfl_core.compare_week(season.year, week, fixtures.SEASONTYPE, data_dir=data_dir, export_excel=False))
+        return rows
+    return run
+
+def make_compare_case(resolve_names):
+    def case(season, workdir):
+        inputs = load_week_inputs(season, workdir)
+
+        def run():
+            return sum(len(nfl_core.build_comparison(props_data, stats_data, vectorized=True, resolve_names=resolve_names)) for _, stats_data, _, props_data in inputs)
+        return run
+    return case
+
+def case_export_stats_excel(season, workdir):
+    inputs = load_week_inputs(season, workdir)
+
+    def run():
+        for week, stats_data, _, _ in inputs:
+            nfl_core.save_stats_to_excel(stats_data.dropna(axis=1, how="all"), os.path.join(workdir, f"NFL_Week_{week}_Player_Stats.xlsx"))
+        return sum(len(stats_data) for _, stats_data, _, _ in inputs)
+    return run
+
+def case_export_props_excel(season, workdir):
+    inputs = load_week_inputs(season, workdir)
+
+    def run():
+        for week, _, props, _ in inputs:
+            nfl_core.save_props_to_excel(props, os.path.join(workdir, f"NFL_Player_Props_Week_{week}.xlsx"))
+        return sum(len(props) for _, _, props, _ in inputs)
+    return run
+
+def case_export_comparison_excel(season, workdir):
+    comparisons = [
+        (week, nfl_core.add_totals_rows(nfl_core.build_comparison(props_data, stats_data, vectorized=True, resolve_names=False)))
+        for week, stats_data, _, props_data in load_week_inputs(season, workdir)
+    ]
+
+    def run():
+        for week, comparison_df in comparisons:
+            nfl_core.save_comparison_to_excel(comparison_df, os.path.join(workdir, f"Player_Props_Comparison_Week_{week}.xlsx"))
+        return sum(len(comparison_df) for _, comparison_df in comparisons)
+    return run
+
+CASES = {
+    "week_stats": case_week_stats,
+    "parse_stats": case_parse_stats,
+    "parse_props": case_parse_props,
+    "props_snapshot": case_props_snapshot,
+    "consensus_prices": case_consensus_prices,
+    "compare": make_compare_case(resolve_names=False),
+    "compare_resolve_names": make_compare_case(resolve_names=True),
+    "replay_pipeline": case_replay_pipeline,
+    "export_stats_excel": case_export_stats_excel,
+    "export_props_excel": case_export_props_excel,
+    "export_comparison_excel": case_export_comparison_excel,
+}
+
+# Function to read the process's memory in MB, "VmHWM" is the peak and "VmRSS" the current size
+def read_proc_status(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return None
+
+# Function to reset the peak memory so the setup's peak does not hide the case's own peak.
+# Only Linux can reset it, elsewhere the setup's peak stays included. Returns the memory to measure from.
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return read_proc_status("VmRSS")
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    if os.path.exists("/proc/self/status"):
+        return read_proc_status("VmHWM")
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# Function to run one case in this process and return its measurements
+def run_case(name, games, bookmakers, seed, repeat):
+    import pandas  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+
+    block_network()
+    season = fixtures.SyntheticSeason(games, bookmakers, seed)
+    workdir = tempfile.mkdtemp(prefix="nfl_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # Files the pipeline writes next to itself (e.g. the name map) stay in the scratch directory
+    try:
+        # Setup output is not interesting, only the case's result line is printed
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            run = CASES[name](season, workdir)
+            baseline = reset_peak_rss()
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = run()
+                times.append(time.perf_counter() - start)
+        peak = peak_rss_mb() - baseline
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"case": name, "games": games, "bookmakers": bookmakers, "rows": rows, "seconds": round(min(times), 4), "peak_mb": round(max(peak, 0.0), 1)}
+
+def run_in_subprocess(name, games, bookmakers, seed, repeat):
+    command = [
+        sys.executable, __file__, "--case", name, "--games", str(games),
+        "--bookmakers", str(bookmakers), "--seed", str(seed), "--repeat", str(repeat),
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def package_versions():
+    versions = {}
+    for module_name in ("pandas", "numpy", "pyarrow", "xlsxwriter"):
+        try:
+            versions[module_name] = __import__(module_name).__version__
+        except ImportError:
+            versions[module_name] = None
+    return versions
+
+# Function to compare results with a baseline, returns the lines to print and the number of regressions
+def diff_results(results, baseline, threshold):
+    previous = {(result["case"], result["games"], result["bookmakers"]): result for result in baseline["results"]}
+    lines = []
+    regressions = 0
+    for result in results:
+        before = previous.get((result["case"], result["games"], result["bookmakers"]))
+        if before is None:
+            lines.append(f"{result['case']:>24} {result['games']:>5} games: not in the baseline")
+            continue
+        time_change = result["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        memory_change = result["peak_mb"] / before["peak_mb"] - 1 if before["peak_mb"] >= MIN_PEAK_MB else 0.0
+        regressed = time_change > threshold or memory_change > threshold
+        regressions += regressed
+        lines.append(
+            f"{result['case']:>24} {result['games']:>5} games: {before['seconds']:.3f}s -> {result['seconds']:.3f}s ({time_change:+.0%}), "
+            f"{before['peak_mb']:.1f} -> {result['peak_mb']:.1f} MB ({memory_change:+.0%}){'  REGRESSION' if regressed else ''}"
+        )
+    return lines, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stats, props, comparison and export stages on synthetic seasons.")
+    parser.add_argument("--games", default=DEFAULT_GAMES, help="Comma-separated season sizes in games (272 is a regular season)")
+    parser.add_argument("--bookmakers", type=int, default=DEFAULT_BOOKMAKERS)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case, the fastest one is reported")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated cases to run")
+    parser.add_argument("--save", default=None, help="Write the results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--baseline", default=None, help="Compare the results with this JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, int(args.games), args.bookmakers, args.seed, args.repeat)))
+        return 0
+
+    results = []
+    for games in [int(value) for value in args.games.split(",")]:
+        for name in args.cases.split(","):
+            result = run_in_subprocess(name, games, args.bookmakers, args.seed, args.repeat)
+            results.append(result)
+            print(f"{name:>24} {games:>5} games: {result['rows']:>8} rows in {result['seconds']:.3f}s, peak memory +{result['peak_mb']:.1f} MB")
+
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "versions": package_versions(),
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"Results saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressions = diff_results(results, baseline, args.threshold)
+        print(f"Compared with {args.baseline} ({baseline.get('created', 'unknown date')}):")
+        for line in lines:
+            print(line)
+        if regressions:
+            print(f"{regressions} regressions above {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
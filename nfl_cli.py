@@ -0,0 +1,239 @@
+# Command-line entry point for running the pipeline without the GUI (e.g. from cron or on a server):
+#   python nfl_cli.py stats --year 2024 --week 3
+#   python nfl_cli.py props --year 2024 --week 4
+#   python nfl_cli.py compare --year 2024 --week 3
+#   python nfl_cli.py backfill --seasons 2021-2023 --seasontypes 2 3
+#   python nfl_cli.py live --year 2024 --week 4
+#   python nfl_cli.py lines --year 2024 --week 4 --open-close
+#   python nfl_cli.py summary --year 2024
+#   python nfl_cli.py odds --year 2024 --week 4
+#   python nfl_cli.py export --year 2024 --week 3
+#   python nfl_cli.py --record week3.sqlite3 stats --year 2024 --week 3
+import argparse
+import datetime
+import sys
+
+import nfl_core
+
+# Function to parse "2021-2023" or "2021,2023" into a list of integers
+def parse_range(value):
+    numbers = []
+    for part in value.split(","):
+        if "-" in part:
+            start, end = part.split("-", 1)
+            numbers.extend(range(int(start), int(end) + 1))
+        else:
+            numbers.append(int(part))
+    return numbers
+
+def run_stats(args):
+    nfl_core.get_nfl_week_stats(args.year, args.week, args.seasontype, data_dir=args.data_dir, export_excel=not args.no_excel)
+    return 0
+
+def run_props(args):
+    all_props = nfl_core.download_week_props(
+        args.year, args.week, api_key=args.api_key, data_dir=args.data_dir,
+        export_excel=not args.no_excel, quota_floor=args.quota_floor
+    )
+    if all_props is None:
+        print("No events data available.")
+        return 1
+    if not all_props:
+        print("No player props data available.")
+        return 1
+    return 0
+
+# Function to parse an ISO time, times without a zone are taken as UTC
+def parse_time(value):
+    when = datetime.datetime.fromisoformat(value)
+    return when if when.tzinfo else when.replace(tzinfo=datetime.timezone.utc)
+
+def run_compare(args):
+    # Excel inputs (e.g. a hand-made props sheet) or the data store
+    if args.props_file or args.stats_file:
+        if not (args.props_file and args.stats_file):
+            print("--props-file and --stats-file must be given together.", file=sys.stderr)
+            return 2
+        output = args.output or f"Player_Props_Comparison_Week_{args.week}.xlsx"
+        nfl_core.compare_props_and_stats(args.props_file, args.stats_file, output)
+    else:
+        nfl_core.compare_week(
+            args.year, args.week, args.seasontype, props_path=args.props_path,
+            data_dir=args.data_dir, export_excel=not args.no_excel, as_of=args.as_of
+        )
+    return 0
+
+def run_lines(args):
+    if args.open_close:
+        lines = nfl_core.opening_closing_lines(args.data_dir, until=args.as_of, year=args.year, week=args.week)
+    else:
+        lines = nfl_core.props_as_of(args.as_of, args.data_dir, args.year, args.week)
+    if lines.empty:
+        print("No prop lines found.")
+        return 1
+    if args.output:
+        with nfl_core.atomic_workbook(args.output) as workbook:
+            nfl_core.write_frame_sheet(workbook, "Prop Lines", lines, freeze_header=True)
+        print(f"{len(lines)} prop lines saved to {args.output}")
+    else:
+        print(lines.to_string(index=False))
+    return 0
+
+def run_odds(args):
+    props = nfl_core.props_as_of(args.as_of, args.data_dir, args.year, args.week)
+    if props.empty:
+        print("No prop lines found.")
+        return 1
+    prices = nfl_core.consensus_prices(props)
+    if args.output:
+        nfl_core.save_prices_to_excel(prices, args.output)
+    else:
+        print(prices.sort_values("EV", ascending=False).head(args.top).to_string(index=False))
+    return 0
+
+def run_summary(args):
+    tables = nfl_core.season_hit_rates(args.year, args.seasontype, args.data_dir) if args.no_excel else nfl_core.export_season_hit_rates(
+        args.year, args.seasontype, args.data_dir, filename=args.output
+    )
+    if tables["Summary"].empty:
+        print("No comparisons found.")
+        return 1
+    print(tables["Summary"].to_string(index=False))
+    return 0
+
+def run_export(args):
+    filename = nfl_core.export_week_workbook(args.year, args.week, args.seasontype, args.data_dir, filename=args.output)
+    return 0 if filename else 1
+
+def run_live(args):
+    nfl_core.run_live(
+        args.year, args.week, args.seasontype, props_path=args.props_path,
+        data_dir=args.data_dir, export_excel=not args.no_excel
+    )
+    return 0
+
+def run_backfill(args):
+    nfl_core.backfill_nfl_stats(
+        args.seasons, args.seasontypes, args.weeks, data_dir=args.data_dir,
+        max_workers=args.workers, force=args.force
+    )
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Download NFL stats and player props and compare them.")
+    parser.add_argument("--data-dir", default=nfl_core.DATA_DIR, help="Directory of the columnar data store")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the on-disk response cache")
+    parser.add_argument("--metrics", action="store_true", help=f"Log stage timings and request counts to {nfl_core.METRICS_LOG_PATH}")
+    parser.add_argument("--profile", action="store_true", help="Also save a cProfile of the run (implies --metrics)")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--record", metavar="ARCHIVE", default=None, help="Also save every request and response to this archive")
+    transport.add_argument("--replay", metavar="ARCHIVE", default=None, help="Serve every request from this archive, without the network")
+    parser.add_argument("--replay-latency", type=float, default=nfl_core.REPLAY_LATENCY, help="Scale of the recorded response times to wait (0 replays at memory speed)")
+    parser.add_argument("--replay-error-rate", type=float, default=nfl_core.REPLAY_ERROR_RATE, help="Chance of each replayed request failing first (e.g. 0.05)")
+    parser.add_argument("--replay-seed", type=int, default=nfl_core.REPLAY_SEED, help="Seed for picking the failing requests")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Options shared by the single-week commands
+    week_parser = argparse.ArgumentParser(add_help=False)
+    week_parser.add_argument("--year", type=int, default=datetime.datetime.now().year)
+    week_parser.add_argument("--week", type=int, required=True)
+    week_parser.add_argument("--seasontype", type=int, default=2, choices=sorted(nfl_core.SEASON_TYPES))
+    week_parser.add_argument("--no-excel", action="store_true", help="Skip the Excel export")
+
+    stats_parser = subparsers.add_parser("stats", parents=[week_parser], help="Download a week of player stats")
+    stats_parser.set_defaults(func=run_stats)
+
+    # Props are planned in regular season week windows and stored by season and week, so there is no --seasontype
+    props_parser = subparsers.add_parser("props", help="Download a regular season week's upcoming player props")
+    props_parser.add_argument("--year", type=int, default=datetime.datetime.now().year)
+    props_parser.add_argument("--week", type=int, required=True)
+    props_parser.add_argument("--no-excel", action="store_true", help="Skip the Excel export")
+    props_parser.add_argument("--api-key", default=None, help="Odds API key (defaults to ODDS_API_KEY)")
+    props_parser.add_argument("--quota-floor", type=int, default=nfl_core.ODDS_QUOTA_FLOOR)
+    props_parser.set_defaults(func=run_props)
+
+    compare_parser = subparsers.add_parser("compare", parents=[week_parser], help="Compare props with stats")
+    compare_parser.add_argument("--props-path", default=None, help="Props partition to use, e.g. an older full snapshot (defaults to the week's line history)")
+    compare_parser.add_argument("--props-file", default=None, help="Compare Excel files instead of the data store")
+    compare_parser.add_argument("--stats-file", default=None)
+    compare_parser.add_argument("--output", default=None, help="Output file for --props-file/--stats-file")
+    compare_parser.add_argument("--as-of", type=parse_time, default=None, help="Use the lines as they stood at this time (e.g. 2024-09-29T17:00)")
+    compare_parser.set_defaults(func=run_compare)
+
+    export_parser = subparsers.add_parser("export", parents=[week_parser], help="Export a week's stats, props, comparison and season summary into one workbook")
+    export_parser.add_argument("--output", default=None, help="Excel file to save (defaults to NFL_<year>_Week_<week>.xlsx)")
+    export_parser.set_defaults(func=run_export)
+
+    live_parser = subparsers.add_parser("live", parents=[week_parser], help="Follow a week's games live, regrading props as stats come in")
+    live_parser.add_argument("--props-path", default=None, help="Props partition to use, e.g. an older full snapshot (defaults to the week's line history)")
+    live_parser.set_defaults(func=run_live)
+
+    lines_parser = subparsers.add_parser("lines", help="Show a week's prop lines from the line history")
+    lines_parser.add_argument("--year", type=int, default=datetime.datetime.now().year)
+    lines_parser.add_argument("--week", type=int, default=None)
+    lines_parser.add_argument("--as-of", type=parse_time, default=None, help="Lines as they stood at this time (defaults to now)")
+    lines_parser.add_argument("--open-close", action="store_true", help="Show opening and closing lines instead")
+    lines_parser.add_argument("--output", default=None, help="Save to this Excel file instead of printing")
+    lines_parser.set_defaults(func=run_lines)
+
+    odds_parser = subparsers.add_parser("odds", help="Consensus no-vig odds and best prices of a week's props")
+    odds_parser.add_argument("--year", type=int, default=datetime.datetime.now().year)
+    odds_parser.add_argument("--week", type=int, required=True)
+    odds_parser.add_argument("--as-of", type=parse_time, default=None, help="Use the lines as they stood at this time (defaults to now)")
+    odds_parser.add_argument("--top", type=int, default=25, help="Best prices to print, by expected value")
+    odds_parser.add_argument("--output", default=None, help="Save every price to this Excel file instead of printing")
+    odds_parser.set_defaults(func=run_odds)
+
+    summary_parser = subparsers.add_parser("summary", help="Hit rates by market, bookmaker, player, team and week over the stored comparisons")
+    summary_parser.add_argument("--year", type=int, default=None, help="Season to summarize (defaults to every stored season)")
+    summary_parser.add_argument("--seasontype", type=int, default=None, choices=sorted(nfl_core.SEASON_TYPES))
+    summary_parser.add_argument("--output", default=None, help="Excel file to save (defaults to NFL_<year>_Hit_Rates.xlsx)")
+    summary_parser.add_argument("--no-excel", action="store_true", help="Only print the summary")
+    summary_parser.set_defaults(func=run_summary)
+
+    backfill_parser = subparsers.add_parser("backfill", help="Download stats for a range of seasons")
+    backfill_parser.add_argument("--seasons", type=parse_range, required=True, help="e.g. 2021-2023")
+    backfill_parser.add_argument("--seasontypes", type=int, nargs="+", default=[2], choices=sorted(nfl_core.SEASON_TYPES))
+    backfill_parser.add_argument("--weeks", type=parse_range, default=None, help="e.g. 1-18 (defaults to every week)")
+    backfill_parser.add_argument("--workers", type=int, default=nfl_core.BACKFILL_WORKERS)
+    backfill_parser.add_argument("--force", action="store_true", help="Download weeks that are already done again")
+    backfill_parser.set_defaults(func=run_backfill)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.no_cache:
+        nfl_core.CACHE_ENABLED = False
+    if args.metrics or args.profile:
+        nfl_core.METRICS_ENABLED = True
+        nfl_core.PROFILE_RUNS = args.profile
+    if args.record or args.replay:
+        nfl_core.TRANSPORT_MODE = "record" if args.record else "replay"
+        nfl_core.TRANSPORT_ARCHIVE = args.record or args.replay
+        nfl_core.REPLAY_LATENCY = args.replay_latency
+        nfl_core.REPLAY_ERROR_RATE = args.replay_error_rate
+        nfl_core.REPLAY_SEED = args.replay_seed
+    previous_run = nfl_core.last_run()
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        run = nfl_core.last_run()
+        if run is not None and run is not previous_run:
+            print(run.summary())
+            if run.profile_path:
+                print(f"Profile saved to {run.profile_path}")
+        if nfl_core.TRANSPORT_MODE != "live":
+            archive = nfl_core.get_transport_archive().stats()
+            if args.record:
+                print(f"{archive['recorded']} responses recorded to {args.record}")
+            else:
+                print(f"{archive['replayed']} responses replayed from {args.replay}, {archive['missing']} not recorded")
+
+if __name__ == "__main__":
+    sys.exit(main())
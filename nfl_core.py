@@ -0,0 +1,2907 @@
+# Core logic for downloading NFL stats and player props and comparing them.
+# Nothing here depends on the GUI, and pandas/requests are only imported when a function needs them.
+import contextlib
+import contextvars
+import datetime
+import json
+import os
+import threading
+import time
+
+# Odds API key, read from the ODDS_API_KEY environment variable
+ODDS_API_KEY = os.environ.get("ODDS_API_KEY", "YOUR_API_KEY_HERE")  # Or replace with your actual API key
+
+# Labels for each stats category, in the order ESPN lists the stats
+STAT_LABELS = {
+    "passing": ["Completions/Attempts", "Passing Yards", "Yards per Attempt", "Passing TDs", "Interceptions", "Sacks-Yards Lost", "QBR", "Passer Rating"],
+    "rushing": ["Attempts", "Rushing Yards", "Yards per Carry", "Rushing TDs", "Longest Run"],
+    "receiving": ["Receptions", "Receiving Yards", "Yards per Reception", "Receiving TDs", "Longest Reception", "Targets"],
+    "fumbles": ["Fumbles", "Fumbles Lost", "Fumbles Recovered"],
+    "defensive": ["Total Tackles", "Solo Tackles", "Sacks", "Tackles for Loss", "Passes Defended", "Interceptions", "Defensive TDs"],
+    "interceptions": ["Interceptions", "Return Yards", "Return TDs"],
+    "kickReturns": ["Returns", "Yards", "Avg Yards/Return", "Longest Return", "Return TDs"],
+    "puntReturns": ["Returns", "Yards", "Avg Yards/Return", "Longest Return", "Return TDs"],
+    "kicking": ["FG Made/Attempted", "FG%", "Longest FG", "XP Made/Attempted", "Total Points"],
+    "punting": ["Punts", "Yards", "Avg Yards/Punt", "Inside 20", "Longest Punt"],
+}
+
+# Function to display player stats (from your original code)
+def display_player_stats(category, athlete_name, stats):
+    # Zip labels with stats to create a dictionary
+    return {label: stat for label, stat in zip(STAT_LABELS.get(category, []), stats)}
+
+# ESPN API base URL (overridable, e.g. to point at a local stub server)
+ESPN_BASE_URL = "https://site.api.espn.com/apis/site/v2/sports/football/nfl"
+
+# Settings for fetching ESPN game summaries concurrently
+MAX_WORKERS = 8  # Maximum number of summaries fetched at once
+REQUEST_TIMEOUT = 10  # Timeout in seconds for each request
+MAX_RETRIES = 3  # Retries on connection errors, 429 and 5xx responses
+BACKOFF_FACTOR = 0.5  # Sleeps 0.5s, 1s, 2s, ... between retries
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Settings for the transport under every request. "live" goes to the network, "record" also saves each
+# request and response to TRANSPORT_ARCHIVE and "replay" serves them from the archive without the network.
+TRANSPORT_MODE = "live"
+TRANSPORT_ARCHIVE = os.path.join("nfl_cache", "transport.sqlite3")
+REPLAY_LATENCY = 0.0  # Scale of the recorded response times (and retry backoff) to wait, 0 replays at memory speed
+REPLAY_ERROR_RATE = 0.0  # Chance of each replayed attempt failing (a dropped connection or a 503), retried like a real one
+REPLAY_SEED = 0  # The same seed fails the same requests on every replay
+
+# Class for an archive of recorded requests and responses, stored zlib-compressed in SQLite.
+# A URL requested several times (e.g. live polls) is replayed in the order it was recorded.
+class TransportArchive:
+    def __init__(self, path=TRANSPORT_ARCHIVE):
+        import sqlite3
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS exchanges ("
+            "key TEXT NOT NULL, number INTEGER NOT NULL, url TEXT NOT NULL, status INTEGER NOT NULL, reason TEXT, "
+            "headers TEXT NOT NULL, body BLOB NOT NULL, elapsed REAL NOT NULL, recorded REAL NOT NULL, PRIMARY KEY (key, number))"
+        )
+        self._conn.commit()
+        self._keys_recorded = set()  # Keys recorded by this process, older recordings of them are replaced
+        self._exchanges = None  # Key -> recorded exchanges in order, loaded on the first replay
+        self._served = {}
+        self._clock = None
+
+    # The key is the method and URL with its params sorted, leaving out the API key
+    @staticmethod
+    def make_key(method, url, params=None):
+        from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+        parts = urlsplit(url)
+        query = parse_qsl(parts.query, keep_blank_values=True) + [(k, str(v)) for k, v in (params or {}).items()]
+        query = urlencode(sorted((k, v) for k, v in query if k != "apiKey"))
+        return f"{method.upper()} {urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))}"
+
+    # Function to save a response, headers is a dict and body the decoded bytes
+    def add(self, method, url, status, headers, body, params=None, reason=None, elapsed=0.0, recorded=None):
+        import zlib
+
+        key = self.make_key(method, url, params)
+        # The body is stored decoded, so headers about its encoding on the wire no longer apply
+        headers = {k: v for k, v in headers.items() if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+        blob = zlib.compress(body)
+        with self._lock:
+            if key not in self._keys_recorded:
+                self._keys_recorded.add(key)
+                self._conn.execute("DELETE FROM exchanges WHERE key = ?", (key,))
+            number = self._conn.execute("SELECT COUNT(*) FROM exchanges WHERE key = ?", (key,)).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO exchanges (key, number, url, status, reason, headers, body, elapsed, recorded) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, number, key.split(" ", 1)[1], status, reason, json.dumps(headers), blob, elapsed, recorded if recorded is not None else time.time())
+            )
+            self._conn.commit()
+            self.recorded += 1
+
+    def _load(self):
+        exchanges = {}
+        for key, status, reason, headers, body, elapsed, recorded in self._conn.execute(
+            "SELECT key, status, reason, headers, body, elapsed, recorded FROM exchanges ORDER BY key, number"
+        ):
+            exchanges.setdefault(key, []).append({
+                "status": status, "reason": reason, "headers": json.loads(headers), "body": body, "elapsed": elapsed, "recorded": recorded,
+            })
+        self._exchanges = exchanges
+        first = min((exchange["recorded"] for recorded in exchanges.values() for exchange in recorded), default=None)
+        self._clock = first
+
+    # Function to get the next recorded response of a request and how many times it was served before.
+    # The last recording repeats once a URL runs out. Returns (None, 0) when the URL was never recorded.
+    def next(self, method, url):
+        import zlib
+
+        key = self.make_key(method, url)
+        with self._lock:
+            if self._exchanges is None:
+                self._load()
+            recorded = self._exchanges.get(key)
+            if not recorded:
+                self.missing += 1
+                return None, 0
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            exchange = recorded[min(served, len(recorded) - 1)]
+            self._clock = exchange["recorded"]
+            self.replayed += 1
+        return dict(exchange, key=key, body=zlib.decompress(exchange["body"])), served
+
+    # Time the response served last was recorded at, so the replay sees the clock of the recording
+    def clock(self):
+        with self._lock:
+            if self._exchanges is None:
+                self._load()
+            return None if self._clock is None else datetime.datetime.fromtimestamp(self._clock, datetime.timezone.utc)
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM exchanges").fetchone()[0]
+        return {"recorded": self.recorded, "replayed": self.replayed, "missing": self.missing, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_transport_archive = None
+_transport_archive_lock = threading.Lock()
+
+# Function to get the shared archive of TRANSPORT_ARCHIVE, reopened when the setting changes
+def get_transport_archive():
+    global _transport_archive
+    with _transport_archive_lock:
+        if _transport_archive is None or _transport_archive.path != TRANSPORT_ARCHIVE:
+            _transport_archive = TransportArchive(TRANSPORT_ARCHIVE)
+    return _transport_archive
+
+# Function to get the current time, or the time of the recording during a replay
+def transport_now():
+    if TRANSPORT_MODE == "replay":
+        when = get_transport_archive().clock()
+        if when is not None:
+            return when
+    return datetime.datetime.now(datetime.timezone.utc)
+
+# Class for a session adapter that sends requests to the network and saves every response to an archive
+class RecordingAdapter:
+    def __init__(self, adapter, archive):
+        self.adapter = adapter
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        self.archive.add(
+            request.method, request.url, response.status_code, dict(response.headers), response.content,
+            reason=response.reason, elapsed=time.perf_counter() - start
+        )
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+# Class for a session adapter that serves recorded responses instead of sending requests. Injected
+# failures go through the adapter's Retry like real ones, so retries and backoff show up in the metrics.
+class ReplayAdapter:
+    def __init__(self, adapter, archive, latency=0.0, error_rate=0.0, seed=0):
+        self.adapter = adapter
+        self.archive = archive
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def send(self, request, **kwargs):
+        import io
+        import random
+        import requests
+        from urllib3.exceptions import MaxRetryError, ProtocolError
+        from urllib3.response import HTTPResponse
+
+        exchange, served = self.archive.next(request.method, request.url)
+        if exchange is None:
+            raise requests.ConnectionError(f"No recorded response for {TransportArchive.make_key(request.method, request.url)}", request=request)
+
+        # Each request gets its own generator, so threads fetching concurrently do not change which requests fail
+        rng = random.Random(f"{self.seed}:{exchange['key']}:{served}")
+        retry = self.adapter.max_retries
+        status, reason, headers, body = exchange["status"], exchange["reason"], exchange["headers"], exchange["body"]
+        while self.error_rate and rng.random() < self.error_rate:
+            dropped = rng.random() < 0.5
+            try:
+                if dropped:
+                    retry = retry.increment(request.method, request.url, error=ProtocolError("Connection dropped by the replay"))
+                elif retry.is_retry(request.method, 503):
+                    retry = retry.increment(request.method, request.url)
+                else:
+                    status, reason, headers, body = 503, "Service Unavailable", {}, b"Service Unavailable"
+                    break
+            except MaxRetryError as e:
+                if dropped:
+                    raise requests.ConnectionError(e, request=request)
+                # Like raise_on_status=False, the last failed response goes back to the caller
+                status, reason, headers, body = 503, "Service Unavailable", {}, b"Service Unavailable"
+                break
+            if self.latency:
+                time.sleep(self.latency * retry.get_backoff_time())
+
+        if self.latency:
+            time.sleep(self.latency * exchange["elapsed"])
+        raw = HTTPResponse(
+            body=io.BytesIO(body), headers=headers, status=status, reason=reason,
+            preload_content=False, decode_content=False, retries=retry, request_method=request.method
+        )
+        return self.adapter.build_response(request, raw)
+
+    def close(self):
+        self.adapter.close()
+
+# Function to create a pooled keep-alive session with retry and backoff
+def create_session(max_workers=MAX_WORKERS, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False  # Return the last response so the caller can report it
+    )
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+    if TRANSPORT_MODE == "record":
+        adapter = RecordingAdapter(adapter, get_transport_archive())
+    elif TRANSPORT_MODE == "replay":
+        adapter = ReplayAdapter(adapter, get_transport_archive(), REPLAY_LATENCY, REPLAY_ERROR_RATE, REPLAY_SEED)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Settings for run instrumentation (stage timings, request counts, cache and quota), off by default
+METRICS_ENABLED = False
+METRICS_LOG_PATH = os.path.join("nfl_logs", "runs.jsonl")  # One JSON line per run
+PROFILE_RUNS = False  # Also dump a cProfile of each run's calling thread next to the log
+
+# The run being measured, None when instrumentation is off. Worker threads see it through submit_in_context.
+_current_run = contextvars.ContextVar("nfl_current_run", default=None)
+_last_run = contextvars.ContextVar("nfl_last_run", default=None)
+
+# Class for the measurements of one run (e.g. one week of stats), shared by its worker threads
+class RunMetrics:
+    def __init__(self, name, params=None):
+        self.name = name
+        self.params = params or {}
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+        self.seconds = 0.0
+        self.stages = {}
+        self.requests = {}
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.odds_remaining = None
+        self.odds_used = None
+        self.error = None
+        self.profile_path = None
+        self._lock = threading.Lock()
+
+    def add_stage_time(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_request(self, api, response=None):
+        with self._lock:
+            counts = self.requests.setdefault(api, {"count": 0, "bytes": 0, "errors": 0, "seconds": 0.0, "status": {}})
+            counts["count"] += 1
+            if response is None:
+                counts["errors"] += 1
+                return
+            status = str(response.status_code)
+            counts["status"][status] = counts["status"].get(status, 0) + 1
+            content = getattr(response, "content", None)
+            counts["bytes"] += len(content if content is not None else response.text)
+            elapsed = getattr(response, "elapsed", None)
+            if elapsed is not None:
+                counts["seconds"] += elapsed.total_seconds()
+
+            # urllib3 keeps the retries it made for this response
+            retries = getattr(getattr(response, "raw", None), "retries", None)
+            self.retries += len(getattr(retries, "history", None) or ())
+
+    def add_cache_lookup(self, hit):
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def set_odds_quota(self, remaining, used):
+        with self._lock:
+            self.odds_remaining = remaining
+            self.odds_used = used
+
+    def to_record(self):
+        return {
+            "run": self.name,
+            "params": self.params,
+            "started": self.started.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "seconds": round(self.seconds, 4),
+            "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            "requests": self.requests,
+            "retries": self.retries,
+            "cache": {"hits": self.cache_hits, "misses": self.cache_misses},
+            "odds_quota": {"remaining": self.odds_remaining, "used": self.odds_used},
+            "error": self.error,
+            "profile": self.profile_path,
+        }
+
+    # Function to give a short summary for the GUI status area
+    def summary(self):
+        stages = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in self.stages.items())
+        request_count = sum(counts["count"] for counts in self.requests.values())
+        request_bytes = sum(counts["bytes"] for counts in self.requests.values())
+        lines = [
+            f"{self.name}: {self.seconds:.1f}s ({stages})" if stages else f"{self.name}: {self.seconds:.1f}s",
+            f"{request_count} requests, {request_bytes / 1024:.0f} KB, {self.retries} retries, "
+            f"cache {self.cache_hits} hits / {self.cache_misses} misses",
+        ]
+        if self.odds_remaining is not None:
+            lines.append(f"Odds API quota remaining: {self.odds_remaining}")
+        if self.error:
+            lines.append(f"Failed: {self.error}")
+        return "\n".join(lines)
+
+def write_run_record(run, path=None):
+    path = path or METRICS_LOG_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    line = json.dumps(run.to_record(), separators=(",", ":"))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+# Decorator for the pipeline's entry points: measures the call as one run when instrumentation is on.
+# Calls made inside a run (e.g. each week of a backfill) count towards the outer run.
+def instrumented_run(name, *param_names):
+    import functools
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED or _current_run.get() is not None:
+                return function(*args, **kwargs)
+
+            params = dict(zip(param_names, args))
+            params.update((key, kwargs[key]) for key in param_names if key in kwargs)
+            run = RunMetrics(name, {key: value for key, value in params.items() if isinstance(value, (int, float, str, list, tuple))})
+            token = _current_run.set(run)
+            profiler = None
+            if PROFILE_RUNS:
+                import cProfile
+
+                profiler = cProfile.Profile()
+                profiler.enable()
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                run.error = str(e)
+                raise
+            finally:
+                run.seconds = time.perf_counter() - start
+                if profiler is not None:
+                    profiler.disable()
+                    run.profile_path = os.path.join(
+                        os.path.dirname(METRICS_LOG_PATH) or ".", f"{name}_{run.started.strftime('%Y%m%dT%H%M%S%fZ')}.prof"
+                    )
+                    os.makedirs(os.path.dirname(run.profile_path) or ".", exist_ok=True)
+                    profiler.dump_stats(run.profile_path)
+                _current_run.reset(token)
+                _last_run.set(run)
+                try:
+                    write_run_record(run)
+                except OSError as e:
+                    print(f"Failed to write run metrics: {e}")
+        return wrapper
+    return decorator
+
+# Function to get the last run measured in this thread (e.g. to show its summary), None if there is none
+def last_run():
+    return _last_run.get()
+
+def current_run():
+    return _current_run.get()
+
+# Class to time a stage of a run, used through measure()
+class StageTimer:
+    __slots__ = ("run", "stage", "start")
+
+    def __init__(self, run, stage):
+        self.run = run
+        self.stage = stage
+
+    def __enter__(self):
+        if self.run is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.run is not None:
+            self.run.add_stage_time(self.stage, time.perf_counter() - self.start)
+        return False
+
+_NO_STAGE = StageTimer(None, None)
+
+# Function to time a stage of the current run: with measure("fetch"): ...
+def measure(stage):
+    run = _current_run.get()
+    return _NO_STAGE if run is None else StageTimer(run, stage)
+
+def record_request(api, response=None):
+    run = _current_run.get()
+    if run is not None:
+        run.add_request(api, response)
+
+def record_cache_lookup(hit):
+    run = _current_run.get()
+    if run is not None:
+        run.add_cache_lookup(hit)
+
+# Function to submit work to an executor so it counts towards the current run
+def submit_in_context(executor, function, *args, **kwargs):
+    return executor.submit(contextvars.copy_context().run, function, *args, **kwargs)
+
+# Class to wrap an iterator, adding up the time spent waiting for its items
+class TimedIterator:
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.waited = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self.iterator)
+        finally:
+            self.waited += time.perf_counter() - start
+
+# Settings for jobs: long-running tasks (e.g. the GUI's downloads) run on a shared pool, report their
+# progress and can be cancelled. The pipeline checks for cancellation before each request and game.
+JOB_WORKERS = 2  # Jobs run at once, each still fetching its games concurrently
+
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, key, title):
+        self.key = key
+        self.title = title
+        self.progress = (0, 0, "")  # (done, total, message)
+        self.result = None
+        self.error = None
+        self.run = None  # Metrics of the job's run, when instrumentation is on
+        self.future = None
+        self.on_progress = None
+        self._cancel_event = threading.Event()
+
+    # The job stops at its next check, a queued job does not start at all
+    def cancel(self):
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+# Class to run jobs on a shared pool. A job with the same key as one still queued or running is not started
+# again. on_progress(job) and on_done(job) are called from the pool's threads.
+class JobScheduler:
+    def __init__(self, max_workers=JOB_WORKERS, on_progress=None, on_done=None):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.jobs = {}  # Key -> job queued or running
+        self._lock = threading.Lock()
+
+    # Function to queue function(*args) as a job, returns (job, True), or (the running job, False) for a duplicate
+    def submit(self, key, title, function, *args, **kwargs):
+        with self._lock:
+            job = self.jobs.get(key)
+            if job is not None and not job.cancelled:
+                return job, False
+            job = Job(key, title)
+            job.on_progress = self.on_progress
+            self.jobs[key] = job
+            # Each job gets a fresh context, so the run and job of an earlier job on the same thread do not leak into it
+            job.future = self.executor.submit(contextvars.Context().run, self._run, job, function, args, kwargs)
+        job.future.add_done_callback(lambda future: self._finish(job))
+        return job, True
+
+    def _run(self, job, function, args, kwargs):
+        _current_job.set(job)
+        try:
+            check_cancelled()
+            job.result = function(*args, **kwargs)
+        finally:
+            job.run = _last_run.get()
+
+    def _finish(self, job):
+        with self._lock:
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+        if not job.future.cancelled():
+            error = job.future.exception()
+            if error is not None and not isinstance(error, JobCancelled):
+                job.error = error
+        if self.on_done is not None:
+            self.on_done(job)
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def shutdown(self, wait=False):
+        self.cancel_all()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+def current_job():
+    return _current_job.get()
+
+def check_cancelled():
+    job = _current_job.get()
+    if job is not None and job.cancelled:
+        raise JobCancelled(f"{job.title} was cancelled")
+
+# Function to report the progress of the current job (e.g. games parsed), also a point where it can be cancelled
+def report_progress(done, total, message=""):
+    job = _current_job.get()
+    if job is None:
+        return
+    check_cancelled()
+    job.progress = (done, total, message)
+    if job.on_progress is not None:
+        job.on_progress(job)
+
+# Function to report progress after each item of an iterable (e.g. each game), passing the items through
+def with_progress(iterable, total, label):
+    report_progress(0, total, f"0/{total} {label}")
+    for done, item in enumerate(iterable, start=1):
+        report_progress(done, total, f"{done}/{total} {label}")
+        yield item
+
+# Function to get a temporary path next to path that no other thread or process writes to, for atomic writes
+def temp_path(path):
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+# Settings for the on-disk response cache
+CACHE_ENABLED = True
+CACHE_PATH = os.path.join("nfl_cache", "responses.sqlite3")
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used entries are evicted above this size
+LIVE_TTL = 60  # Seconds to keep data for games that are not final yet
+ODDS_TTL = 10 * 60  # Seconds to keep Odds API events and odds
+
+# Class for a persistent cache of JSON responses, stored zlib-compressed in SQLite
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        import sqlite3
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, expires REAL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    # The key is the URL plus its sorted params, leaving out the API key
+    @staticmethod
+    def make_key(url, params=None):
+        import hashlib
+
+        params = sorted((k, str(v)) for k, v in (params or {}).items() if k != "apiKey")
+        return hashlib.sha256(json.dumps([url, params]).encode("utf-8")).hexdigest()
+
+    def get(self, url, params=None):
+        import zlib
+
+        key = self.make_key(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT data, expires FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                record_cache_lookup(False)
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        record_cache_lookup(True)
+        return json.loads(zlib.decompress(row[0]))
+
+    # A ttl of None means the entry never expires (e.g. box scores of final games)
+    def set(self, url, data, params=None, ttl=None):
+        import zlib
+
+        key = self.make_key(url, params)
+        blob = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, data, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), expires, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+# Function to get the shared response cache, or None when caching is disabled.
+# Recordings and replays skip it, so every request reaches the transport.
+def get_response_cache():
+    global _response_cache
+    if not CACHE_ENABLED or TRANSPORT_MODE != "live":
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+    return _response_cache
+
+# Settings for the columnar data store (Excel files are only an export)
+DATA_DIR = "nfl_data"
+EXPORT_EXCEL = True
+
+STATS_KEY_COLUMNS = ["Game", "Team", "Category", "Player", "Athlete ID"]
+PROPS_COLUMNS = ["Event", "Bookmaker", "Market", "Player", "Prop", "Line", "Odds"]
+
+# Partition paths: stats and comparisons by season/week
+def stats_partition_path(year, week, seasontype=2, data_dir=DATA_DIR):
+    return os.path.join(data_dir, "stats", f"season={year}", f"seasontype={seasontype}", f"week={week:02d}", "stats.parquet")
+
+def comparison_partition_path(year, week, seasontype=2, data_dir=DATA_DIR):
+    return os.path.join(data_dir, "comparison", f"season={year}", f"seasontype={seasontype}", f"week={week:02d}", "comparison.parquet")
+
+# Function to write a partition atomically (write to a temp file, then rename)
+def write_partition(df, path, compression="snappy"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = temp_path(path)
+    df.to_parquet(tmp_path, index=False, compression=compression)
+    os.replace(tmp_path, path)
+    return path
+
+# Function to read a partition, loading only the requested columns that exist in it
+def read_partition(path, columns=None):
+    import pandas as pd
+
+    if columns is not None:
+        import pyarrow.parquet as pq
+
+        available = set(pq.read_schema(path).names)
+        columns = [column for column in columns if column in available]
+    return pd.read_parquet(path, columns=columns)
+
+# Functions to give the props and comparison tables typed columns before storing them
+def type_props_frame(df):
+    import pandas as pd
+
+    df = df.copy()
+    for column in ("Bookmaker", "Market", "Prop"):
+        df[column] = df[column].astype("category")
+    for column in ("Event", "Player"):
+        df[column] = df[column].astype("string")
+    df["Line"] = pd.to_numeric(df["Line"], errors="coerce")
+    df["Odds"] = pd.to_numeric(df["Odds"], errors="coerce")
+    return df
+
+def type_comparison_frame(df):
+    import pandas as pd
+
+    df = df.copy()
+    for column in ("Prop Type", "Side", "Result", "Bookmaker"):
+        df[column] = df[column].astype("category")
+    for column in ("Event", "Player", "Team"):
+        df[column] = df[column].astype("string")
+    for column in ("Line", "Actual Stat", "Odds"):
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+# Settings for the prop line history: each fetch only stores the props whose line or odds moved
+# Offer numbers the props a fetch has more than once (e.g. namesakes in one game), so none of them are lost
+PROP_KEY_COLUMNS = ["Season", "Week", "Event", "Bookmaker", "Market", "Player", "Prop", "Offer"]
+PROP_LINE_COLUMNS = ["Snapshot"] + PROP_KEY_COLUMNS + ["Line", "Odds", "Removed"]
+PROP_LINES_COMPRESSION = "zstd"
+SNAPSHOT_FORMAT = "%Y%m%dT%H%M%S%fZ"  # Fixed width UTC timestamps, so names sort chronologically
+
+def prop_lines_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, "prop_lines")
+
+def prop_lines_partition_path(snapshot, data_dir=DATA_DIR):
+    return os.path.join(prop_lines_dir(data_dir), f"snapshot={snapshot}", "changes.parquet")
+
+# The lines as of the latest snapshot, kept so a new fetch can be diffed without replaying the history.
+# The name also says how many snapshots the state was built from, so a state written by a save that
+# overlapped another one (e.g. from a second process) does not match and gets rebuilt.
+def prop_lines_state_path(snapshot, snapshot_count, data_dir=DATA_DIR):
+    return os.path.join(prop_lines_dir(data_dir), f"state={snapshot}_{snapshot_count}.parquet")
+
+# Saves of the line history in this process run one at a time (e.g. the GUI's props jobs for two weeks)
+_prop_lines_lock = threading.Lock()
+
+def format_snapshot(when):
+    return when.astimezone(datetime.timezone.utc).strftime(SNAPSHOT_FORMAT)
+
+def parse_snapshot(snapshot):
+    return datetime.datetime.strptime(snapshot, SNAPSHOT_FORMAT).replace(tzinfo=datetime.timezone.utc)
+
+def list_prop_line_snapshots(data_dir=DATA_DIR):
+    lines_dir = prop_lines_dir(data_dir)
+    if not os.path.isdir(lines_dir):
+        return []
+    return sorted(
+        name[len("snapshot="):] for name in os.listdir(lines_dir)
+        if name.startswith("snapshot=") and os.path.exists(os.path.join(lines_dir, name, "changes.parquet"))
+    )
+
+def type_prop_lines_frame(df):
+    import pandas as pd
+
+    df = df.copy()
+    df["Snapshot"] = pd.to_datetime(df["Snapshot"], utc=True)
+    for column in ("Season", "Week", "Offer"):
+        df[column] = pd.to_numeric(df[column], errors="coerce").astype("Int16")
+    for column in ("Bookmaker", "Market", "Prop"):
+        df[column] = df[column].astype("category")
+    for column in ("Event", "Player"):
+        df[column] = df[column].astype("string")
+    df["Line"] = pd.to_numeric(df["Line"], errors="coerce")
+    df["Odds"] = pd.to_numeric(df["Odds"], errors="coerce")
+    df["Removed"] = df["Removed"].astype(bool)
+    return df[PROP_LINE_COLUMNS]
+
+# Function to read the line changes recorded up to a time, oldest first. Only the snapshot
+# partitions in the range are read, the time is in their names.
+def read_prop_line_changes(data_dir=DATA_DIR, until=None, since=None):
+    import pandas as pd
+
+    frames = []
+    for snapshot in list_prop_line_snapshots(data_dir):
+        when = parse_snapshot(snapshot)
+        if (until is not None and when > until) or (since is not None and when <= since):
+            continue
+        frames.append(pd.read_parquet(prop_lines_partition_path(snapshot, data_dir)))
+    if not frames:
+        return type_prop_lines_frame(pd.DataFrame(columns=PROP_LINE_COLUMNS))
+    changes = pd.concat(frames, ignore_index=True)
+    return type_prop_lines_frame(changes.sort_values("Snapshot", kind="mergesort", ignore_index=True))
+
+# Function to replay changes into the lines they leave standing (the last change of each prop, unless removed)
+def lines_from_changes(changes):
+    latest = changes.drop_duplicates(PROP_KEY_COLUMNS, keep="last")
+    return latest[~latest["Removed"]].reset_index(drop=True)
+
+def load_prop_lines_state(data_dir=DATA_DIR, snapshots=None):
+    import pandas as pd
+
+    if snapshots is None:
+        snapshots = list_prop_line_snapshots(data_dir)
+    if not snapshots:
+        return type_prop_lines_frame(pd.DataFrame(columns=PROP_LINE_COLUMNS))
+    path = prop_lines_state_path(snapshots[-1], len(snapshots), data_dir)
+    if os.path.exists(path):
+        return type_prop_lines_frame(pd.read_parquet(path))
+    # The state is missing or does not cover every snapshot (e.g. after a crash or overlapping saves), rebuild it
+    return lines_from_changes(read_prop_line_changes(data_dir))
+
+def save_prop_lines_state(state, snapshot, snapshot_count, data_dir=DATA_DIR):
+    path = write_partition(state, prop_lines_state_path(snapshot, snapshot_count, data_dir), PROP_LINES_COMPRESSION)
+    # Another process may be writing or removing a state at the same time, its temporary files are left alone
+    for name in os.listdir(prop_lines_dir(data_dir)):
+        if name.startswith("state=") and name.endswith(".parquet") and name != os.path.basename(path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(prop_lines_dir(data_dir), name))
+    return path
+
+# Function to diff fetched props against the standing lines. A prop is recorded when it is new or its
+# line or odds moved, and as removed when its event was fetched but the prop is gone (e.g. pulled by the book).
+# Returns (changes, new standing lines).
+def diff_prop_lines(state, props, when):
+    import pandas as pd
+
+    keys = PROP_KEY_COLUMNS
+    new = props[keys + ["Line", "Odds"]].astype({key: object for key in keys})
+    old = state[keys + ["Line", "Odds"]].astype({key: object for key in keys})
+
+    merged = new.merge(old, on=keys, how="left", suffixes=("", " Before"), indicator=True)
+    same_line = (merged["Line"] == merged["Line Before"]) | (merged["Line"].isna() & merged["Line Before"].isna())
+    same_odds = (merged["Odds"] == merged["Odds Before"]) | (merged["Odds"].isna() & merged["Odds Before"].isna())
+    moved = (merged["_merge"] == "left_only") | ~(same_line & same_odds)
+    changed = merged.loc[moved, keys + ["Line", "Odds"]].assign(Removed=False)
+
+    fetched_events = old[["Season", "Week", "Event"]].merge(new[["Season", "Week", "Event"]].drop_duplicates(), how="left", indicator=True)["_merge"] == "both"
+    gone = old[fetched_events.to_numpy()].merge(new[keys], on=keys, how="left", indicator=True)
+    removed = gone.loc[gone["_merge"] == "left_only", keys].assign(Line=float("nan"), Odds=float("nan"), Removed=True)
+
+    changes = type_prop_lines_frame(pd.concat([changed, removed], ignore_index=True).assign(Snapshot=when))
+    standing = lines_from_changes(type_prop_lines_frame(pd.concat([state, changes], ignore_index=True)))
+    return changes, standing
+
+# Function to record a fetch of props in the line history, returns the path of the changes (None if nothing moved).
+# year and week say which week the props are for, so comparisons pick the right lines.
+def save_props_snapshot(data, data_dir=DATA_DIR, when=None, year=None, week=None):
+    import pandas as pd
+
+    props = type_props_frame(pd.DataFrame(data, columns=PROPS_COLUMNS)).assign(Season=year, Week=week, Removed=False)
+    props["Offer"] = props.groupby(PROP_KEY_COLUMNS[:-1], sort=False, observed=True, dropna=False).cumcount()
+    with _prop_lines_lock:
+        # Timestamp under the lock, so snapshots are named in the order they are saved
+        if when is None:
+            when = datetime.datetime.now(datetime.timezone.utc)
+        snapshot = format_snapshot(when)
+        props["Snapshot"] = when
+        snapshots = list_prop_line_snapshots(data_dir)
+        changes, standing = diff_prop_lines(load_prop_lines_state(data_dir, snapshots), type_prop_lines_frame(props), when)
+        if changes.empty:
+            return None
+        path = write_partition(changes, prop_lines_partition_path(snapshot, data_dir), PROP_LINES_COMPRESSION)
+        save_prop_lines_state(standing, snapshot, len(snapshots) + 1, data_dir)
+    return path
+
+# Function to get the props as they stood at a time (None for the latest), optionally for one week
+def props_as_of(when=None, data_dir=DATA_DIR, year=None, week=None):
+    lines = load_prop_lines_state(data_dir) if when is None else lines_from_changes(read_prop_line_changes(data_dir, until=when))
+    if year is not None:
+        lines = lines[lines["Season"] == year]
+    if week is not None:
+        lines = lines[lines["Week"] == week]
+    return lines.reset_index(drop=True)
+
+# Function to get each prop's opening and closing line (the last one up to until, e.g. kickoff) and how often it moved
+def opening_closing_lines(data_dir=DATA_DIR, until=None, year=None, week=None):
+    changes = read_prop_line_changes(data_dir, until=until)
+    if year is not None:
+        changes = changes[changes["Season"] == year]
+    if week is not None:
+        changes = changes[changes["Week"] == week]
+    offered = changes[~changes["Removed"]]
+    columns = {"Line": "Line", "Odds": "Odds", "Snapshot": "Time"}
+    opening = offered.drop_duplicates(PROP_KEY_COLUMNS, keep="first")[PROP_KEY_COLUMNS + list(columns)]
+    closing = offered.drop_duplicates(PROP_KEY_COLUMNS, keep="last")[PROP_KEY_COLUMNS + list(columns)]
+    lines = opening.rename(columns={column: f"Opening {name}" for column, name in columns.items()}).merge(
+        closing.rename(columns={column: f"Closing {name}" for column, name in columns.items()}), on=PROP_KEY_COLUMNS
+    )
+    moves = offered.groupby(PROP_KEY_COLUMNS, sort=False, observed=True, dropna=False).size().rename("Moves") - 1
+    lines = lines.merge(moves.reset_index(), on=PROP_KEY_COLUMNS, how="left")
+    lines["Line Change"] = lines["Closing Line"] - lines["Opening Line"]
+    return lines.reset_index(drop=True)
+
+# Function to load the props of a week for a comparison: a given partition (e.g. a full snapshot saved
+# before the line history existed) or the week's lines in the line history (as of a time)
+def load_week_props(year, week, props_path=None, as_of=None, data_dir=DATA_DIR, columns=("Event", "Bookmaker", "Player", "Market", "Prop", "Line", "Odds")):
+    columns = list(columns)
+    if props_path is not None:
+        return read_partition(props_path, columns=columns)
+    lines = props_as_of(as_of, data_dir, year, week)
+    if lines.empty:
+        raise Exception(f"No props found for week {week} of {year} in the data store")
+    return lines[columns]
+
+def has_stored_props(year, week, data_dir=DATA_DIR):
+    return not props_as_of(None, data_dir, year, week).empty
+
+def is_status_final(status):
+    return bool((status or {}).get('type', {}).get('completed'))
+
+def is_summary_final(summary_data):
+    competitions = summary_data.get('header', {}).get('competitions', [])
+    return bool(competitions) and is_status_final(competitions[0].get('status'))
+
+def is_scoreboard_final(scoreboard_data):
+    events = scoreboard_data.get('events', [])
+    return bool(events) and all(is_status_final(event.get('status')) for event in events)
+
+# Function to fetch the scoreboard of a week, cached forever once every game is final
+def fetch_scoreboard(session, year, week, seasontype=2, timeout=REQUEST_TIMEOUT, base_url=ESPN_BASE_URL, cache=None):
+    check_cancelled()
+    url = f"{base_url}/scoreboard?dates={year}&seasontype={seasontype}&week={week}"
+    if cache is not None:
+        cached = cache.get(url)
+        if cached is not None:
+            return cached
+
+    response = session.get(url, timeout=timeout)
+    record_request("espn", response)
+    if response.status_code == 200:
+        scoreboard_data = response.json()
+        if cache is not None:
+            cache.set(url, scoreboard_data, ttl=None if is_scoreboard_final(scoreboard_data) else LIVE_TTL)
+        return scoreboard_data
+
+    print("Failed to retrieve data:", response.status_code)
+    raise Exception(f"Failed to retrieve data: {response.status_code}")
+
+# Function to fetch the summary of a single game
+def fetch_game_summary(session, game_id, timeout=REQUEST_TIMEOUT, base_url=ESPN_BASE_URL, cache=None):
+    import requests
+
+    check_cancelled()
+    summary_url = f"{base_url}/summary?event={game_id}"
+    if cache is not None:
+        cached = cache.get(summary_url)
+        if cached is not None:
+            return cached
+
+    try:
+        summary_response = session.get(summary_url, timeout=timeout)
+    except requests.RequestException as e:
+        record_request("espn")
+        print(f"Failed to retrieve summary for game ID {game_id}: {e}")
+        return None
+    record_request("espn", summary_response)
+
+    if summary_response.status_code == 200:
+        summary_data = summary_response.json()
+        if cache is not None:
+            cache.set(summary_url, summary_data, ttl=None if is_summary_final(summary_data) else LIVE_TTL)
+        return summary_data
+    print(f"Failed to retrieve summary for game ID {game_id}")
+    return None
+
+# Function to fetch game summaries concurrently, yielding them in the same order as game_ids.
+# Only a few summaries are held at once, so memory does not grow with the number of games.
+def iter_game_summaries(session, game_ids, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, base_url=ESPN_BASE_URL, cache=None):
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not game_ids:
+        return
+    window = 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(game_ids)))) as executor:
+        pending = deque()
+        for game_id in game_ids:
+            pending.append(submit_in_context(executor, fetch_game_summary, session, game_id, timeout, base_url, cache))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# Typed schema of each stats category, one entry per ESPN stat: (columns, type, separator).
+# Composite stats such as "23/35" or "3-21" are split on the separator into two columns.
+STAT_SCHEMA = {
+    "passing": [
+        (("Passing Completions", "Passing Attempts"), "int16", "/"), (("Passing Yards",), "int16", None),
+        (("Yards per Attempt",), "float64", None), (("Passing TDs",), "int16", None), (("Interceptions",), "int16", None),
+        (("Sacks Taken", "Sack Yards Lost"), "int16", "-"), (("QBR",), "float64", None), (("Passer Rating",), "float64", None),
+    ],
+    "rushing": [
+        (("Rushing Attempts",), "int16", None), (("Rushing Yards",), "int16", None), (("Yards per Carry",), "float64", None),
+        (("Rushing TDs",), "int16", None), (("Longest Run",), "int16", None),
+    ],
+    "receiving": [
+        (("Receptions",), "int16", None), (("Receiving Yards",), "int16", None), (("Yards per Reception",), "float64", None),
+        (("Receiving TDs",), "int16", None), (("Longest Reception",), "int16", None), (("Targets",), "int16", None),
+    ],
+    "fumbles": [
+        (("Fumbles",), "int16", None), (("Fumbles Lost",), "int16", None), (("Fumbles Recovered",), "int16", None),
+    ],
+    "defensive": [
+        (("Total Tackles",), "int16", None), (("Solo Tackles",), "int16", None), (("Sacks",), "float64", None),
+        (("Tackles for Loss",), "float64", None), (("Passes Defended",), "int16", None), (("Interceptions",), "int16", None),
+        (("Defensive TDs",), "int16", None),
+    ],
+    "interceptions": [
+        (("Interceptions",), "int16", None), (("Return Yards",), "int16", None), (("Return TDs",), "int16", None),
+    ],
+    "kickReturns": [
+        (("Returns",), "int16", None), (("Yards",), "int16", None), (("Avg Yards/Return",), "float64", None),
+        (("Longest Return",), "int16", None), (("Return TDs",), "int16", None),
+    ],
+    "puntReturns": [
+        (("Returns",), "int16", None), (("Yards",), "int16", None), (("Avg Yards/Return",), "float64", None),
+        (("Longest Return",), "int16", None), (("Return TDs",), "int16", None),
+    ],
+    "kicking": [
+        (("FG Made", "FG Attempted"), "int16", "/"), (("FG%",), "float64", None), (("Longest FG",), "int16", None),
+        (("XP Made", "XP Attempted"), "int16", "/"), (("Total Points",), "int16", None),
+    ],
+    "punting": [
+        (("Punts",), "int16", None), (("Yards",), "int16", None), (("Avg Yards/Punt",), "float64", None),
+        (("Inside 20",), "int16", None), (("Longest Punt",), "int16", None),
+    ],
+}
+
+# Columns of the stats table: one row per player per category, with the stats of every category side by side
+STATS_SCORE_COLUMNS = ["Home Team Score", "Away Team Score"]
+STAT_CATEGORY_COLUMNS = {category: tuple(column for columns, _, _ in fields for column in columns) for category, fields in STAT_SCHEMA.items()}
+STAT_TYPES = {column: dtype for fields in STAT_SCHEMA.values() for columns, dtype, _ in fields for column in columns}
+STAT_COLUMNS = list(STAT_TYPES)
+STATS_COLUMNS = STATS_KEY_COLUMNS + STATS_SCORE_COLUMNS + STAT_COLUMNS
+
+# Raw (Excel) column names that map onto the typed columns
+RAW_STAT_COLUMNS = {
+    "Completions/Attempts": (("Passing Completions", "Passing Attempts"), "/"),
+    "Sacks-Yards Lost": (("Sacks Taken", "Sack Yards Lost"), "-"),
+    "FG Made/Attempted": (("FG Made", "FG Attempted"), "/"),
+    "XP Made/Attempted": (("XP Made", "XP Attempted"), "/"),
+    "Attempts": (("Rushing Attempts",), None),
+}
+
+STATS_BATCH_SIZE = 2000  # Rows parsed and written per batch
+
+# Class for one parsed row of the stats table, values are already typed
+class StatRow:
+    __slots__ = ("game", "team", "category", "player", "athlete_id", "home_score", "away_score", "values")
+
+    def __init__(self, game, team, category, player, athlete_id, home_score, away_score, values):
+        self.game = game
+        self.team = team
+        self.category = category
+        self.player = player
+        self.athlete_id = athlete_id  # ESPN athlete id, None if the payload has none
+        self.home_score = home_score
+        self.away_score = away_score
+        self.values = values  # Stat values in the order of STAT_CATEGORY_COLUMNS[category]
+
+def parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_number(value, dtype):
+    number = parse_float(value)
+    if number is None or number != number:
+        return None
+    return int(number) if dtype == "int16" else number
+
+# Function to parse the raw stat strings of a category into typed values, splitting composite stats
+def parse_stat_values(category, stats):
+    values = []
+    for (columns, dtype, separator), stat in zip(STAT_SCHEMA.get(category, ()), stats):
+        if separator is None:
+            values.append(parse_number(stat, dtype))
+            continue
+        parts = str(stat).split(separator, 1)
+        if len(parts) != len(columns):
+            parts = [None] * len(columns)
+        values.extend(parse_number(part, dtype) for part in parts)
+    # Pad missing trailing stats so values line up with STAT_CATEGORY_COLUMNS
+    columns_count = len(STAT_CATEGORY_COLUMNS.get(category, ()))
+    values.extend([None] * (columns_count - len(values)))
+    return tuple(values)
+
+# Function to get the game info of every game on a scoreboard
+def get_game_infos(scoreboard_data):
+    game_infos = []
+    for game in scoreboard_data.get('events', []):
+        competitors = game['competitions'][0]['competitors']
+        home_team_info = [team for team in competitors if team['homeAway'] == 'home'][0]
+        away_team_info = [team for team in competitors if team['homeAway'] == 'away'][0]
+        game_infos.append({
+            "id": game['id'],
+            "home_team": home_team_info['team']['shortDisplayName'],
+            "away_team": away_team_info['team']['shortDisplayName'],
+            "home_score": home_team_info.get('score', 0),
+            "away_score": away_team_info.get('score', 0),
+        })
+    return game_infos
+
+# Generator of the stats rows in a game summary
+def iter_summary_rows(info, summary_data):
+    game = f"{info['home_team']} vs {info['away_team']}"
+    home_score = parse_int(info["home_score"])
+    away_score = parse_int(info["away_score"])
+
+    # Process each team in the game
+    for team in summary_data.get('boxscore', {}).get('players', []):
+        team_name = team['team']['displayName']
+
+        # Iterate over each player
+        for player in team.get('statistics', []):
+            category_name = player['name']
+
+            for athlete in player.get('athletes', []):
+                athlete_name = athlete['athlete']['displayName']
+                athlete_id = athlete['athlete'].get('id')
+                values = parse_stat_values(category_name, athlete.get('stats', []))
+                yield StatRow(game, team_name, category_name, athlete_name, athlete_id and str(athlete_id), home_score, away_score, values)
+
+def iter_batches(items, batch_size):
+    from itertools import islice
+
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def stats_schema():
+    import pyarrow as pa
+
+    text = pa.dictionary(pa.int32(), pa.string())
+    fields = [pa.field(column, text) for column in ("Game", "Team", "Category")]
+    fields += [pa.field(column, pa.string()) for column in ("Player", "Athlete ID")]
+    fields += [pa.field(column, pa.int16()) for column in STATS_SCORE_COLUMNS]
+    fields += [pa.field(column, pa.int16() if dtype == "int16" else pa.float64()) for column, dtype in STAT_TYPES.items()]
+    return pa.schema(fields)
+
+# Function to turn a batch of rows into an Arrow table, filling preallocated column lists
+def stat_rows_to_table(rows, schema=None):
+    import pyarrow as pa
+
+    count = len(rows)
+    columns = {column: [None] * count for column in STATS_COLUMNS}
+    games, teams, categories, players = columns["Game"], columns["Team"], columns["Category"], columns["Player"]
+    athlete_ids = columns["Athlete ID"]
+    home_scores, away_scores = columns["Home Team Score"], columns["Away Team Score"]
+    for i, row in enumerate(rows):
+        games[i] = row.game
+        teams[i] = row.team
+        categories[i] = row.category
+        players[i] = row.player
+        athlete_ids[i] = row.athlete_id
+        home_scores[i] = row.home_score
+        away_scores[i] = row.away_score
+        for column, value in zip(STAT_CATEGORY_COLUMNS.get(row.category, ()), row.values):
+            columns[column][i] = value
+    return pa.Table.from_pydict(columns, schema=schema or stats_schema())
+
+# Function to stream rows into a Parquet partition batch by batch, returns (rows, games) written
+def write_stats_rows(rows, path, batch_size=STATS_BATCH_SIZE):
+    import pyarrow.parquet as pq
+
+    schema = stats_schema()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = temp_path(path)
+    writer = None
+    row_count = 0
+    games = set()
+    try:
+        for batch in iter_batches(rows, batch_size):
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, schema)
+            writer.write_table(stat_rows_to_table(batch, schema))
+            row_count += len(batch)
+            games.update(row.game for row in batch)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path, path)
+    return row_count, len(games)
+
+# Function to bring a stats table with raw ESPN columns (e.g. an older Excel file) onto the typed columns
+def normalize_stats_frame(df):
+    import pandas as pd
+
+    raw_columns = [column for column in RAW_STAT_COLUMNS if column in df.columns]
+    if not raw_columns:
+        return df
+    df = df.copy()
+    for raw_column in raw_columns:
+        columns, separator = RAW_STAT_COLUMNS[raw_column]
+        if separator is None:
+            df[columns[0]] = pd.to_numeric(df[raw_column], errors="coerce")
+        else:
+            parts = df[raw_column].astype("string").str.split(separator, n=1, expand=True).reindex(columns=[0, 1])
+            for i, column in enumerate(columns):
+                df[column] = pd.to_numeric(parts[i], errors="coerce")
+    return df.drop(columns=raw_columns)
+
+# Function to download a week of player stats. Summaries are parsed as they arrive and streamed
+# into the week's partition in batches. Returns the partition path, the rows and games written, the
+# games on the scoreboard and whether every game of the week is final.
+@instrumented_run("stats", "year", "week", "seasontype")
+def get_nfl_week_stats(year, week, seasontype=2, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, base_url=ESPN_BASE_URL, session=None, cache=None, data_dir=DATA_DIR, export_excel=None, batch_size=STATS_BATCH_SIZE):
+    if cache is None:
+        cache = get_response_cache()
+    own_session = session is None
+    if own_session:
+        session = create_session(max_workers)
+
+    path = stats_partition_path(year, week, seasontype, data_dir)
+    run = current_run()
+    try:
+        with measure("fetch"):
+            scoreboard_data = fetch_scoreboard(session, year, week, seasontype, timeout, base_url, cache)
+        game_infos = get_game_infos(scoreboard_data)
+
+        # Retrieve detailed summary for each game and parse it as soon as it is its turn
+        summaries = iter_game_summaries(session, [info["id"] for info in game_infos], max_workers, timeout, base_url, cache)
+        summaries = with_progress(summaries, len(game_infos), "games")
+        if run is not None:
+            summaries = TimedIterator(summaries)
+        rows = (
+            row
+            for info, summary_data in zip(game_infos, summaries) if summary_data is not None
+            for row in iter_summary_rows(info, summary_data)
+        )
+        stream_start = time.perf_counter()
+        row_count, game_count = write_stats_rows(rows, path, batch_size)
+        report_progress(len(game_infos), len(game_infos), f"{len(game_infos)}/{len(game_infos)} games")
+
+        # Fetching and parsing overlap, time spent waiting for summaries counts as fetching
+        if run is not None:
+            run.add_stage_time("fetch", summaries.waited)
+            run.add_stage_time("parse", time.perf_counter() - stream_start - summaries.waited)
+    finally:
+        if own_session:
+            session.close()
+
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+    if row_count:
+        print(f"Data saved to {path}")
+
+    if export_excel is None:
+        export_excel = EXPORT_EXCEL
+    if export_excel:
+        import pandas as pd
+
+        with measure("export"):
+            # Columns no player has a value for are left out of the sheet
+            df = read_partition(path).dropna(axis=1, how="all") if row_count else pd.DataFrame()
+            save_stats_to_excel(df, f"NFL_Week_{week}_Player_Stats.xlsx")
+    return {"path": path if row_count else None, "rows": row_count, "games": game_count, "events": len(game_infos), "final": is_scoreboard_final(scoreboard_data)}
+
+# Settings for the Excel exports. Workbooks are written row by row in xlsxwriter's constant_memory mode,
+# so only one batch of rows is turned into cells at a time, and column widths come from a sample of rows.
+EXCEL_BATCH_ROWS = 5000  # Rows converted to Python values at once
+EXCEL_WIDTH_SAMPLE = 500  # Rows sampled to size the columns
+EXCEL_MIN_WIDTH = 8
+EXCEL_MAX_WIDTH = 50
+HEADER_FORMAT = {"bold": True, "text_wrap": True, "valign": "top", "fg_color": "#D7E4BC", "border": 1}
+
+def open_workbook(filename):
+    import xlsxwriter
+
+    # Text is written as text, like pandas does (no formulas or links from values such as "=..." or "http://...")
+    return xlsxwriter.Workbook(filename, {
+        "constant_memory": True,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+        "default_date_format": "yyyy-mm-dd hh:mm",
+    })
+
+# Function to write a workbook to a temporary file that only replaces filename once it is complete,
+# so a failed or cancelled export never leaves a half-written file: with atomic_workbook(filename) as workbook: ...
+@contextlib.contextmanager
+def atomic_workbook(filename):
+    tmp_path = temp_path(filename)
+    workbook = open_workbook(tmp_path)
+    try:
+        yield workbook
+        workbook.close()
+    except BaseException:
+        try:
+            workbook.close()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, filename)
+
+# Function to turn a frame into rows of plain Python values, a batch at a time. Missing values become blank cells.
+def frame_rows(df, batch_rows=EXCEL_BATCH_ROWS):
+    for start in range(0, len(df), batch_rows):
+        check_cancelled()
+        batch = df.iloc[start:start + batch_rows]
+        for column in batch.select_dtypes(include="datetimetz").columns:  # Excel has no time zones
+            batch = batch.assign(**{column: batch[column].dt.tz_convert(None)})
+        batch = batch.astype(object)
+        yield from batch.where(batch.notna(), None).itertuples(index=False, name=None)
+
+def record_rows(records, columns):
+    for record in records:
+        yield tuple(record.get(column) for column in columns)
+
+# Function to size columns from the longest value in a sample of rows instead of measuring every cell
+def sample_widths(columns, sample_rows):
+    widths = [len(str(column)) for column in columns]
+    for row in sample_rows:
+        for i, value in enumerate(row):
+            if value is not None:
+                widths[i] = max(widths[i], len(str(value)))
+    return [min(max(width + 2, EXCEL_MIN_WIDTH), EXCEL_MAX_WIDTH) for width in widths]
+
+def frame_widths(df, sample_size=EXCEL_WIDTH_SAMPLE):
+    step = max(1, len(df) // sample_size)
+    return sample_widths(list(df.columns), frame_rows(df.iloc[::step]))
+
+# Function to write a sheet: the header, then the rows in order. column_formats maps columns to formats
+# and row_format(values) can pick a format for a row (e.g. bold totals). Returns the worksheet and the last row.
+def write_sheet(workbook, sheet_name, columns, rows, widths, header_format=HEADER_FORMAT, column_formats=None, row_format=None, freeze_header=False):
+    worksheet = workbook.add_worksheet(sheet_name)
+    column_formats = column_formats or {}
+    for col_num, (column, width) in enumerate(zip(columns, widths)):
+        worksheet.set_column(col_num, col_num, width, column_formats.get(column))
+    worksheet.write_row(0, 0, columns, workbook.add_format(header_format))
+    if freeze_header:
+        worksheet.freeze_panes(1, 0)
+
+    last_row = 0
+    for last_row, values in enumerate(rows, start=1):
+        worksheet.write_row(last_row, 0, values, row_format(values) if row_format else None)
+    return worksheet, last_row
+
+def write_frame_sheet(workbook, sheet_name, df, **options):
+    return write_sheet(workbook, sheet_name, list(df.columns), frame_rows(df), frame_widths(df), **options)
+
+# Function to write a table of rates (e.g. hit rates), showing rates as percentages and the given columns with 2 decimals
+def write_rates_sheet(workbook, sheet_name, df, percent_columns=(), decimal_columns=()):
+    percent_format = workbook.add_format({'num_format': '0.0%'})
+    decimal_format = workbook.add_format({'num_format': '0.00'})
+    column_formats = {column: percent_format for column in percent_columns}
+    column_formats.update({column: decimal_format for column in decimal_columns})
+    return write_frame_sheet(workbook, sheet_name, df, header_format={'bold': True, 'bg_color': '#D7E4BC', 'border': 1}, column_formats=column_formats, freeze_header=True)
+
+def write_stats_sheet(workbook, df, sheet_name="Player Stats"):
+    return write_frame_sheet(workbook, sheet_name, df)
+
+# Props come as the list of records get_nfl_player_props builds, or as a frame
+def write_props_sheet(workbook, data, sheet_name="Player Props"):
+    if not isinstance(data, list):
+        return write_frame_sheet(workbook, sheet_name, data)
+    columns = list(data[0]) if data else PROPS_COLUMNS
+    step = max(1, len(data) // EXCEL_WIDTH_SAMPLE)
+    return write_sheet(workbook, sheet_name, columns, record_rows(data, columns), sample_widths(columns, record_rows(data[::step], columns)))
+
+def save_stats_to_excel(df, filename):
+    with atomic_workbook(filename) as workbook:
+        write_stats_sheet(workbook, df)
+    print(f"Data saved to {filename}")
+
+# Settings for backfilling stats over several seasons
+SEASON_TYPES = {1: "preseason", 2: "regular season", 3: "postseason"}
+SEASON_TYPE_WEEKS = {1: range(1, 5), 2: range(1, 19), 3: range(1, 6)}
+REGULAR_SEASON_WEEKS_BEFORE_2021 = 17  # The 18th week was added in 2021
+BACKFILL_WORKERS = 4  # Weeks downloaded at once, each also fetching its games concurrently
+BACKFILL_CHECKPOINT = "backfill_checkpoint.json"
+
+def season_type_weeks(year, seasontype):
+    if seasontype == 2 and year < 2021:
+        return range(1, REGULAR_SEASON_WEEKS_BEFORE_2021 + 1)
+    return SEASON_TYPE_WEEKS[seasontype]
+
+# A season is over once its Super Bowl is played, by the start of March
+def is_season_over(year, now=None):
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    return now >= datetime.datetime(year + 1, 3, 1, tzinfo=datetime.timezone.utc)
+
+def backfill_units(seasons, seasontypes=(2,), weeks=None):
+    return [(year, seasontype, week) for year in seasons for seasontype in seasontypes for week in (weeks or season_type_weeks(year, seasontype))]
+
+def backfill_unit_key(year, seasontype, week):
+    return f"{year}-{seasontype}-{week:02d}"
+
+def load_backfill_checkpoint(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# A week is only done once every game was final and it has stats, weeks not played yet or still in
+# progress are downloaded again. A week without games in a season that is over (e.g. an unused
+# postseason week) is done as well. Checkpoints written before the final flag was kept count as not done.
+def is_backfill_unit_done(entry):
+    return bool(entry) and (entry.get("final", False) and entry.get("rows", 0) > 0 or entry.get("empty", False))
+
+def save_backfill_checkpoint(checkpoint, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# Function to download stats for a range of seasons, season types and weeks into the data store.
+# Completed weeks are checkpointed, so an interrupted or early backfill resumes where it stopped.
+# Its stage timings add up the weeks downloaded in parallel, so they can exceed the run's wall time.
+@instrumented_run("backfill", "seasons", "seasontypes", "weeks")
+def backfill_nfl_stats(seasons, seasontypes=(2,), weeks=None, data_dir=DATA_DIR, max_workers=BACKFILL_WORKERS, force=False):
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    checkpoint_path = os.path.join(data_dir, BACKFILL_CHECKPOINT)
+    checkpoint = load_backfill_checkpoint(checkpoint_path)
+
+    # Skip weeks that are checkpointed as complete
+    units = []
+    for year, seasontype, week in backfill_units(seasons, seasontypes, weeks):
+        if force or not is_backfill_unit_done(checkpoint.get(backfill_unit_key(year, seasontype, week))):
+            units.append((year, seasontype, week))
+    total_units = len(backfill_units(seasons, seasontypes, weeks))
+    print(f"Backfill: {len(units)} weeks to download, {total_units - len(units)} already done")
+    if not units:
+        return checkpoint
+
+    session = create_session(MAX_WORKERS * max_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {
+        submit_in_context(executor, get_nfl_week_stats, year, week, seasontype, session=session, data_dir=data_dir, export_excel=False): (year, seasontype, week)
+        for year, seasontype, week in units
+    }
+    start_time = time.time()
+    done = 0
+    failed = 0
+    games = 0
+    try:
+        for future in as_completed(futures):
+            year, seasontype, week = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Backfill: {year} {SEASON_TYPES[seasontype]} week {week} failed: {e}")
+                continue
+
+            week_games = result["games"]
+            done += 1
+            games += week_games
+            entry = {"games": week_games, "rows": result["rows"], "final": result["final"], "empty": result["events"] == 0 and is_season_over(year)}
+            if is_backfill_unit_done(entry):
+                checkpoint[backfill_unit_key(year, seasontype, week)] = entry
+                save_backfill_checkpoint(checkpoint, checkpoint_path)
+                state = "has no games" if entry["empty"] else "done"
+            else:
+                state = "not final yet, downloaded again next time"
+
+            elapsed = time.time() - start_time
+            games_per_second = games / elapsed if elapsed > 0 else 0.0
+            eta = elapsed / (done + failed) * (len(units) - done - failed)
+            print(f"Backfill: {year} {SEASON_TYPES[seasontype]} week {week} {state} ({week_games} games), "
+                  f"{done + failed}/{len(units)} weeks, {games_per_second:.1f} games/sec, ETA {eta:.0f}s")
+    except KeyboardInterrupt:
+        print(f"Backfill interrupted, {done} weeks saved to {checkpoint_path}")
+        raise
+    finally:
+        # Pending weeks are cancelled, running ones finish and their final games come from the response cache next time
+        executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
+
+    print(f"Backfill finished: {done} weeks, {games} games, {failed} failed in {time.time() - start_time:.1f}s")
+    return checkpoint
+
+# Odds API settings
+ODDS_API_BASE_URL = "https://api.the-odds-api.com/v4/sports/americanfootball_nfl"
+ODDS_MARKETS = [
+    "player_pass_tds", "player_rush_yds", "player_receptions", "player_reception_yds", "player_reception_longest",
+    "player_pass_attempts", "player_pass_completions", "player_pass_interceptions", "player_rush_attempts", "player_rush_longest"
+]
+ODDS_REGIONS = ["us"]
+ODDS_MAX_WORKERS = 4  # Maximum number of event odds requests in flight at once
+ODDS_QUOTA_FLOOR = 25  # Never let the remaining Odds API quota drop below this
+ODDS_QUOTA_CACHE_KEY = f"{ODDS_API_BASE_URL}/quota"  # The last quota seen, kept next to the cached events
+
+# Class to track the Odds API quota from the x-requests-remaining / x-requests-used response headers
+class OddsQuota:
+    def __init__(self, floor=ODDS_QUOTA_FLOOR):
+        self.floor = floor
+        self.remaining = None
+        self.used = None
+        self.last_cost = None
+        self.reserved = 0  # Cost of requests currently in flight
+        self._lock = threading.Lock()
+
+    def _read_headers(self, response):
+        remaining = response.headers.get("x-requests-remaining")
+        used = response.headers.get("x-requests-used")
+        last = response.headers.get("x-requests-last")
+        if remaining is not None:
+            self.remaining = int(float(remaining))
+        if used is not None:
+            self.used = int(float(used))
+        if last is not None:
+            self.last_cost = int(float(last))
+        run = current_run()
+        if run is not None and self.remaining is not None:
+            run.set_odds_quota(self.remaining, self.used)
+
+    def update(self, response):
+        with self._lock:
+            self._read_headers(response)
+
+    # Function to take a quota saved by an earlier download, until a response tells the current one
+    def restore(self, saved):
+        with self._lock:
+            if saved and self.remaining is None:
+                self.remaining = saved.get("remaining")
+                self.used = saved.get("used")
+
+    # Function to save the quota next to the cached events, so a download served from the cache still knows it
+    def save(self, cache):
+        if cache is not None and self.remaining is not None:
+            cache.set(ODDS_QUOTA_CACHE_KEY, {"remaining": self.remaining, "used": self.used}, ttl=ODDS_TTL)
+
+    # Reserve quota for a request, returns False if it could cross the floor
+    def reserve(self, cost):
+        with self._lock:
+            if self.remaining is not None and self.remaining - self.reserved - cost < self.floor:
+                return False
+            self.reserved += cost
+            return True
+
+    # Release a reservation, updating the quota from the response if there is one
+    def settle(self, cost, response=None):
+        with self._lock:
+            self.reserved -= cost
+            if response is not None:
+                self._read_headers(response)
+
+# Function to get the window of a regular season week (Tuesday to Tuesday, in UTC)
+def get_nfl_week_window(year, week):
+    # Week 1 starts the Tuesday after Labor Day (first Monday in September).
+    # Boundaries are at 12:00 UTC so Monday night games stay in their week.
+    sept_first = datetime.date(year, 9, 1)
+    labor_day = sept_first + datetime.timedelta(days=(7 - sept_first.weekday()) % 7)
+    week_start = labor_day + datetime.timedelta(days=1 + 7 * (week - 1))
+    start = datetime.datetime.combine(week_start, datetime.time(12), tzinfo=datetime.timezone.utc)
+    return start, start + datetime.timedelta(days=7)
+
+def parse_commence_time(value):
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+# Function to pick the events worth spending quota on and estimate the cost
+def plan_nfl_prop_requests(events, year, week, now=None, markets=ODDS_MARKETS, regions=ODDS_REGIONS):
+    if now is None:
+        now = transport_now()
+    start, end = get_nfl_week_window(year, week)
+
+    planned_events = []
+    for event in events:
+        commence_time = event.get('commence_time')
+        if not commence_time:
+            continue
+        kickoff = parse_commence_time(commence_time)
+        if start <= kickoff < end and kickoff > now:
+            planned_events.append(event)
+
+    # Each event odds request costs at most one request per market per region
+    expected_cost = len(planned_events) * len(markets) * len(regions)
+    return planned_events, expected_cost
+
+def get_nfl_events(api_key, session=None, quota=None, cache=None):
+    import requests
+
+    check_cancelled()
+    url = f"{ODDS_API_BASE_URL}/events/"
+    params = {"apiKey": api_key}
+    if cache is None:
+        cache = get_response_cache()
+    if cache is not None:
+        cached = cache.get(url, params)
+        if cached is not None:
+            if quota is not None:
+                quota.restore(cache.get(ODDS_QUOTA_CACHE_KEY))
+            return cached
+
+    response = (session or requests).get(url, params=params, timeout=REQUEST_TIMEOUT)
+    record_request("odds", response)
+    if quota is not None:
+        quota.update(response)
+    if response.status_code == 200:
+        events = response.json()
+        if cache is not None:
+            cache.set(url, events, params, ttl=ODDS_TTL)
+            if quota is not None:
+                quota.save(cache)
+        return events
+    else:
+        print(f"Failed to fetch events: {response.status_code}, {response.text}")
+        return None
+
+def get_nfl_player_props(api_key, event_id, session=None, quota=None, markets=ODDS_MARKETS, regions=ODDS_REGIONS, cache=None):
+    import requests
+
+    check_cancelled()
+    url = f"{ODDS_API_BASE_URL}/events/{event_id}/odds/"
+    params = {
+        "apiKey": api_key,
+        "regions": ",".join(regions),
+        "markets": ",".join(markets),
+        "oddsFormat": "american"
+    }
+
+    # Cached odds cost no quota
+    if cache is None:
+        cache = get_response_cache()
+    odds_data = cache.get(url, params) if cache is not None else None
+
+    if odds_data is None:
+        cost = len(markets) * len(regions)
+        if quota is not None and not quota.reserve(cost):
+            print(f"Skipping event {event_id}: request could drop the Odds API quota below {quota.floor} (remaining {quota.remaining})")
+            return None
+
+        response = None
+        try:
+            response = (session or requests).get(url, params=params, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"Failed to fetch player props for event {event_id}: {e}")
+            return None
+        finally:
+            record_request("odds", response)
+            if quota is not None:
+                quota.settle(cost, response)
+
+        if response.status_code != 200:
+            print(f"Failed to fetch player props: {response.status_code}, {response.text}")
+            return None
+        odds_data = response.json()
+        if cache is not None:
+            cache.set(url, odds_data, params, ttl=ODDS_TTL)
+    return parse_player_props(odds_data)
+
+# Function to flatten an event's odds into one row per bookmaker, market and outcome
+def parse_player_props(odds_data):
+    all_props = []
+    for bookmaker in odds_data.get('bookmakers', []):
+        for market in bookmaker['markets']:
+            for outcome in market['outcomes']:
+                player_name = outcome.get('description', 'N/A')
+                prop_name = outcome['name']
+                line = outcome.get('point', 'N/A')
+                odds = outcome['price']
+                all_props.append({
+                    "Event": f"{odds_data.get('home_team', 'N/A')} vs {odds_data.get('away_team', 'N/A')}",
+                    "Bookmaker": bookmaker['title'],
+                    "Market": market['key'],
+                    "Player": player_name,
+                    "Prop": prop_name,
+                    "Line": line,
+                    "Odds": odds
+                })
+    return all_props
+
+# Function to fetch player props for several events in parallel, keeping event order
+def fetch_nfl_player_props(api_key, events, session=None, quota=None, max_workers=ODDS_MAX_WORKERS):
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not events:
+        return []
+    # While the quota is unknown, the first event is fetched on its own to learn it before the floor is checked
+    results = []
+    report_progress(0, len(events), f"0/{len(events)} events")
+    if quota is not None and quota.remaining is None:
+        results.append(get_nfl_player_props(api_key, events[0]['id'], session, quota))
+        report_progress(1, len(events), f"1/{len(events)} events")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(events)))) as executor:
+        futures = [submit_in_context(executor, get_nfl_player_props, api_key, event['id'], session, quota) for event in events[len(results):]]
+        for future in futures:
+            results.append(future.result())
+            report_progress(len(results), len(events), f"{len(results)}/{len(events)} events")
+
+    all_props = []
+    for event_props in results:
+        if event_props:
+            all_props.extend(event_props)
+    if quota is not None:
+        quota.save(get_response_cache())
+        print(f"Odds API quota: {quota.used} used, {quota.remaining} remaining")
+    return all_props
+
+def save_props_to_excel(data, filename="NFL_Player_Props.xlsx"):
+    with atomic_workbook(filename) as workbook:
+        write_props_sheet(workbook, data)
+    print(f"Data saved to {filename}")
+
+# Function to download the player props of a regular season week into the data store (and Excel).
+# Returns None when there are no events, otherwise the list of props (possibly empty).
+@instrumented_run("props", "year", "week")
+def download_week_props(year, week, api_key=None, data_dir=DATA_DIR, export_excel=None, quota_floor=ODDS_QUOTA_FLOOR):
+    if api_key is None:
+        api_key = ODDS_API_KEY
+    session = create_session(ODDS_MAX_WORKERS, max_retries=1)
+    quota = OddsQuota(quota_floor)
+    try:
+        with measure("fetch"):
+            events = get_nfl_events(api_key, session=session, quota=quota)
+        if not events:
+            return None
+
+        # Only spend quota on games in the selected week that have not started yet
+        planned_events, expected_cost = plan_nfl_prop_requests(events, year, week)
+        remaining = quota.remaining if quota.remaining is not None else "unknown"
+        print(f"Planning {len(planned_events)} of {len(events)} events for week {week}, "
+              f"expected to use up to {expected_cost} Odds API requests ({remaining} remaining, floor {quota.floor})")
+        if not planned_events:
+            print(f"No upcoming events found for week {week}")
+            return []
+
+        with measure("fetch"):
+            all_props = fetch_nfl_player_props(api_key, planned_events, session=session, quota=quota)
+    finally:
+        session.close()
+
+    if all_props:
+        with measure("store"):
+            path = save_props_snapshot(all_props, data_dir, year=year, week=week)
+        print(f"Line changes saved to {path}" if path else "No line changes since the last download")
+        if export_excel is None:
+            export_excel = EXPORT_EXCEL
+        if export_excel:
+            with measure("export"):
+                save_props_to_excel(all_props)
+    return all_props
+
+# Settings for the odds math: an Over and Under are paired on the line they were offered at, the
+# consensus is taken over the bookmakers for each player, market and side
+OUTCOME_PAIR_COLUMNS = ["Event", "Bookmaker", "Market", "Player", "Line"]
+CONSENSUS_COLUMNS = ["Event", "Player", "Market", "Prop"]
+
+# Functions to convert American odds (+150, -110) into implied probabilities and decimal odds, NaN where missing
+def american_to_probability(odds):
+    import numpy as np
+
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        probability = np.where(odds < 0, -odds / (100 - odds), 100 / (odds + 100))
+    return np.where(np.abs(odds) >= 100, probability, np.nan)
+
+def american_to_decimal(odds):
+    import numpy as np
+
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        decimal_odds = np.where(odds < 0, 1 + 100 / -odds, 1 + odds / 100)
+    return np.where(np.abs(odds) >= 100, decimal_odds, np.nan)
+
+def probability_to_american(probability):
+    import numpy as np
+
+    probability = np.asarray(probability, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        odds = np.where(probability > 0.5, -100 * probability / (1 - probability), 100 * (1 - probability) / probability)
+    return np.where((probability > 0) & (probability < 1), np.round(odds), np.nan)
+
+# Function to add each outcome's implied probability and, where the bookmaker offers exactly one Over
+# and one Under on the line, the no-vig probability (both sides scaled to add up to 1) and the vig
+def add_no_vig_probabilities(props):
+    import numpy as np
+    import pandas as pd
+
+    props = props.copy()
+    props['Implied Prob'] = american_to_probability(props['Odds'])
+    side = props['Prop'].astype(object)
+    outcomes = pd.DataFrame({'Over': side == 'Over', 'Under': side == 'Under', 'Prob': props['Implied Prob']}, index=props.index)
+    pairs = outcomes.groupby([props[column] for column in OUTCOME_PAIR_COLUMNS], sort=False, observed=True, dropna=False)
+    total = pairs['Prob'].transform('sum').to_numpy()
+    paired = (
+        (pairs['Over'].transform('sum') == 1) & (pairs['Under'].transform('sum') == 1)
+        & (pairs['Prob'].transform('count') == 2) & (outcomes['Over'] | outcomes['Under'])
+    ).to_numpy()
+    props['No-Vig Prob'] = np.where(paired, props['Implied Prob'] / total, np.nan)
+    props['Vig'] = np.where(paired, total - 1, np.nan)
+    return props
+
+# Function to get the consensus of each player, market and side over the bookmakers: the line most books
+# offer, the mean no-vig probability at that line as fair odds, and the best price at that line with its
+# expected value (no-vig probability x decimal odds - 1)
+def consensus_prices(props):
+    props = add_no_vig_probabilities(props)
+    props['Decimal Odds'] = american_to_decimal(props['Odds'])
+    # The string keys are factorized once, the groupbys and joins below run on the group number
+    props['Group'] = props.groupby(CONSENSUS_COLUMNS, sort=False, observed=True, dropna=False).ngroup()
+
+    by_line = props.groupby(['Group', 'Line'], sort=False).agg(
+        **{'Books': ('Bookmaker', 'nunique'), 'No-Vig Prob': ('No-Vig Prob', 'mean'), 'Avg Vig': ('Vig', 'mean')}
+    ).reset_index()
+    consensus = by_line.sort_values('Books', ascending=False, kind='mergesort').drop_duplicates('Group')
+    consensus = consensus.rename(columns={'Line': 'Consensus Line'})
+    consensus['Fair Odds'] = probability_to_american(consensus['No-Vig Prob'])
+
+    at_line = props[['Group', 'Line', 'Bookmaker', 'Odds', 'Decimal Odds']].merge(consensus[['Group', 'Consensus Line']], on='Group')
+    at_line = at_line[(at_line['Line'] == at_line['Consensus Line']) & at_line['Decimal Odds'].notna()]
+    best = at_line.sort_values('Decimal Odds', ascending=False, kind='mergesort').drop_duplicates('Group')
+    best = best[['Group', 'Bookmaker', 'Odds', 'Decimal Odds']].rename(columns={'Bookmaker': 'Best Bookmaker', 'Odds': 'Best Odds'})
+
+    names = props.drop_duplicates('Group')[['Group'] + CONSENSUS_COLUMNS]
+    prices = names.merge(consensus, on='Group').merge(best, on='Group', how='left')
+    prices['EV'] = prices['No-Vig Prob'] * prices['Decimal Odds'] - 1
+    return prices.drop(columns=['Group', 'Decimal Odds']).sort_values(CONSENSUS_COLUMNS, kind='mergesort', ignore_index=True)
+
+def save_prices_to_excel(prices, filename):
+    with atomic_workbook(filename) as workbook:
+        write_rates_sheet(workbook, "Prices", prices, percent_columns=('No-Vig Prob', 'Avg Vig', 'EV'))
+    print(f"Data saved to {filename}")
+
+# Mapping of Odds API markets to stat columns
+STAT_MAPPING = {
+    "player_pass_tds": "Passing TDs",
+    "player_pass_attempts": "Passing Attempts",
+    "player_pass_completions": "Passing Completions",
+    "player_pass_interceptions": "Interceptions",
+    "player_rush_yds": "Rushing Yards",
+    "player_rush_attempts": "Rushing Attempts",
+    "player_rush_longest": "Longest Run",
+    "player_receptions": "Receptions",
+    "player_reception_yds": "Receiving Yards",
+    "player_reception_longest": "Longest Reception"
+}
+
+COMPARISON_COLUMNS = ['Event', 'Player', 'Team', 'Prop Type', 'Side', 'Line', 'Actual Stat', 'Result', 'Odds', 'Bookmaker']
+
+# Set to False to use the original row-by-row comparison (e.g. to cross-check results)
+USE_VECTORIZED_COMPARE = True
+
+# Settings for matching Odds API player names to ESPN player names
+RESOLVE_PLAYER_NAMES = True
+NAME_MAP_PATH = os.path.join("nfl_cache", "player_names.json")  # Resolved names remembered across weeks
+FUZZY_CUTOFF = 0.85  # Minimum similarity for a fuzzy match within a block
+MAX_BLOCK_SIZE = 100  # Upper bound on the candidates compared in one fuzzy lookup
+
+NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
+NICKNAMES = {
+    "alex": "alexander", "ben": "benjamin", "cam": "cameron", "chris": "christopher", "dan": "daniel",
+    "danny": "daniel", "dave": "david", "gabe": "gabriel", "greg": "gregory", "hollywood": "marquise",
+    "jake": "jacob", "jeff": "jeffrey", "joe": "joseph", "jon": "jonathan", "josh": "joshua", "ken": "kenneth",
+    "kenny": "kenneth", "matt": "matthew", "mike": "michael", "mitch": "mitchell", "nick": "nicholas",
+    "pat": "patrick", "rob": "robert", "sam": "samuel", "steve": "steven", "tom": "thomas", "tony": "anthony",
+    "will": "william", "zach": "zachary", "zack": "zachary"
+}
+
+# Function to normalize a player name: no accents, punctuation, suffixes or nicknames
+def normalize_name(name):
+    import re
+    import unicodedata
+
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+    text = re.sub(r"[^a-z0-9 ]", " ", text.replace("'", "").replace(".", ""))  # "A.J." -> "aj", "Ja'Marr" -> "jamarr"
+    tokens = [token for token in text.split() if token not in NAME_SUFFIXES]
+    if tokens:
+        tokens[0] = NICKNAMES.get(tokens[0], tokens[0])
+    return " ".join(tokens)
+
+def normalize_team(team):
+    return " ".join(str(team).lower().split())
+
+# Function to get the normalized teams of an event such as "Kansas City Chiefs vs Baltimore Ravens"
+def teams_from_event(event):
+    if not isinstance(event, str) or " vs " not in event:
+        return ()
+    return tuple(normalize_team(team) for team in event.split(" vs ") if team and team != "N/A")
+
+# Class to resolve Odds API player names to the player names in a stats table
+class PlayerNameResolver:
+    def __init__(self, stats_data, memo_path=NAME_MAP_PATH, fuzzy_cutoff=FUZZY_CUTOFF):
+        self.memo_path = memo_path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.players = set(stats_data['Player'].dropna())
+        self.by_key = {}  # Normalized name -> [(player, team)]
+        self.blocks = {}  # (last name, team) -> {normalized name: (player, team)}, None matches any
+        self.counts = {"exact": 0, "memo": 0, "normalized": 0, "fuzzy": 0, "unresolved": 0}
+        self._resolved = {}
+        self._dirty = False
+
+        pairs = stats_data[['Player', 'Team']].dropna(subset=['Player']).drop_duplicates()
+        for player, team in pairs.itertuples(index=False):
+            key = normalize_name(player)
+            team_key = normalize_team(team) if isinstance(team, str) else None
+            last_name = key.split()[-1] if key else ""
+            self.by_key.setdefault(key, []).append((player, team_key))
+            self.blocks.setdefault((last_name, team_key), {})[key] = (player, team_key)
+            self.blocks.setdefault((last_name, None), {})[key] = (player, team_key)
+            self.blocks.setdefault((None, team_key), {})[key] = (player, team_key)
+
+        self.memo = {}
+        if memo_path and os.path.exists(memo_path):
+            with open(memo_path, encoding="utf-8") as f:
+                self.memo = json.load(f)
+
+    def _lookup(self, name, teams):
+        if name in self.players:
+            return name, None, "exact"
+
+        for team in teams or ("",):
+            target = self.memo.get(f"{name}|{team}")
+            if target in self.players:
+                return target, None, "memo"
+
+        key = normalize_name(name)
+        candidates = self.by_key.get(key)
+        # With the event's teams known, only players on those teams (or without a team) are candidates
+        if candidates and teams:
+            candidates = [candidate for candidate in candidates if candidate[1] in teams] or [candidate for candidate in candidates if candidate[1] is None]
+        if candidates:
+            player, team = candidates[0]
+            return player, team, "normalized"
+
+        # Fuzzy fallback, only against players with the same last name on the teams in the game,
+        # or against everyone on those teams when no last name matches
+        import difflib
+
+        last_name = key.split()[-1] if key else ""
+        block = {}
+        for team in teams or (None,):
+            block.update(self.blocks.get((last_name, team), {}))
+        if not block:
+            for team in teams:
+                block.update(self.blocks.get((None, team), {}))
+        if block:
+            matches = difflib.get_close_matches(key, list(block)[:MAX_BLOCK_SIZE], n=1, cutoff=self.fuzzy_cutoff)
+            if matches:
+                player, team = block[matches[0]]
+                return player, team, "fuzzy"
+
+        return name, None, "unresolved"
+
+    # Function to resolve one name, given the event it was offered for
+    def resolve(self, name, event=None):
+        if not isinstance(name, str):
+            return name
+        teams = teams_from_event(event)
+        if (name, teams) in self._resolved:
+            return self._resolved[(name, teams)]
+
+        player, team, how = self._lookup(name, teams)
+        self.counts[how] += 1
+        if how in ("normalized", "fuzzy"):
+            self.memo[f"{name}|{team if teams else ''}"] = player
+            self._dirty = True
+        self._resolved[(name, teams)] = player
+        return player
+
+    # Function to resolve a column of names, looking up each (name, event) pair once
+    def resolve_series(self, players, events):
+        import pandas as pd
+
+        pairs = list(zip(players, events))
+        mapping = {pair: self.resolve(*pair) for pair in dict.fromkeys(pairs)}
+        return pd.Series([mapping.get(pair, pair[0]) for pair in pairs], index=players.index)
+
+    def save(self):
+        if not self._dirty or not self.memo_path:
+            return
+        directory = os.path.dirname(self.memo_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = temp_path(self.memo_path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.memo, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.memo_path)
+        self._dirty = False
+
+    def report(self):
+        counts = self.counts
+        print(f"Player names: {counts['exact']} exact, {counts['memo']} remembered, {counts['normalized']} normalized, "
+              f"{counts['fuzzy']} fuzzy, {counts['unresolved']} unresolved")
+
+@instrumented_run("compare", "props_file", "stats_file")
+def compare_props_and_stats(props_file, stats_file, filename, vectorized=None, resolve_names=None):
+    import pandas as pd
+
+    # Load the player props and player stats data
+    report_progress(0, 3, "Loading")
+    with measure("load"):
+        props_data = pd.read_excel(props_file)
+        stats_data = normalize_stats_frame(pd.read_excel(stats_file))
+
+    report_progress(1, 3, "Comparing")
+    with measure("compare"):
+        comparison_df = build_comparison(props_data, stats_data, vectorized, resolve_names)
+
+    # Save to Excel
+    report_progress(2, 3, "Saving")
+    with measure("export"):
+        save_comparison_to_excel(add_totals_rows(comparison_df), filename)
+    print(f"Comparison saved to {filename}")
+
+# Function to compare a week straight from the data store, reading only the needed columns
+@instrumented_run("compare", "year", "week", "seasontype")
+def compare_week(year, week, seasontype=2, props_path=None, data_dir=DATA_DIR, vectorized=None, resolve_names=None, export_excel=None, as_of=None):
+    stats_path = stats_partition_path(year, week, seasontype, data_dir)
+    if not os.path.exists(stats_path):
+        raise Exception(f"No stats found for week {week} of {year}, download them first")
+    stats_columns = ["Player", "Athlete ID", "Team"] + list(dict.fromkeys(STAT_MAPPING.values()))
+    report_progress(0, 3, "Loading")
+    with measure("load"):
+        stats_data = read_partition(stats_path, columns=stats_columns)
+        props_data = load_week_props(year, week, props_path, as_of, data_dir)
+
+    report_progress(1, 3, "Comparing")
+    with measure("compare"):
+        comparison_df = build_comparison(props_data, stats_data, vectorized, resolve_names)
+    report_progress(2, 3, "Saving")
+    with measure("store"):
+        path = write_partition(type_comparison_frame(comparison_df), comparison_partition_path(year, week, seasontype, data_dir))
+        save_week_rollup(comparison_df, year, week, seasontype, data_dir)
+    print(f"Comparison saved to {path}")
+
+    if export_excel is None:
+        export_excel = EXPORT_EXCEL
+    if export_excel:
+        filename = f"Player_Props_Comparison_Week_{week}.xlsx"
+        with measure("export"):
+            save_comparison_to_excel(add_totals_rows(comparison_df), filename)
+        print(f"Comparison saved to {filename}")
+    return comparison_df
+
+# Function to compare props with stats, one row per prop that has a mapped stat and a matching player
+def build_comparison(props_data, stats_data, vectorized=None, resolve_names=None):
+    # Map Odds API player names onto the names used in the stats
+    if resolve_names is None:
+        resolve_names = RESOLVE_PLAYER_NAMES
+    if resolve_names:
+        resolver = PlayerNameResolver(stats_data)
+        props_data = props_data.assign(Player=resolver.resolve_series(props_data['Player'], props_data['Event']))
+        resolver.save()
+        resolver.report()
+
+    # Both paths read the actual stats from the same lookup index
+    index = PlayerStatIndex(stats_data, list(dict.fromkeys(STAT_MAPPING.values())))
+
+    if vectorized is None:
+        vectorized = USE_VECTORIZED_COMPARE
+    if vectorized:
+        return compare_props_vectorized(props_data, stats_data, index=index)
+    return compare_props_iterrows(props_data, stats_data, index=index)
+
+# Function to append the Over/Under totals rows shown at the bottom of the comparison sheet
+def add_totals_rows(comparison_df):
+    import pandas as pd
+
+    # Calculate totals for 'Over' and 'Under'
+    total_over = comparison_df['Result'].value_counts().get('Over', 0)
+    total_under = comparison_df['Result'].value_counts().get('Under', 0)
+    total_results = total_over + total_under
+
+    # Calculate percentages
+    if total_results > 0:
+        over_percentage = total_over / total_results
+        under_percentage = total_under / total_results
+    else:
+        over_percentage = 0
+        under_percentage = 0
+
+    # Create totals rows
+    totals_over_row = {
+        'Event': 'Totals',
+        'Player': '',
+        'Team': '',
+        'Prop Type': '',
+        'Side': '',
+        'Line': '',
+        'Actual Stat': '',
+        'Result': f'{total_over}/{total_results}, {over_percentage:.2%} Over',
+        'Odds': '',
+        'Bookmaker': ''
+    }
+    totals_under_row = {
+        'Event': 'Totals',
+        'Player': '',
+        'Team': '',
+        'Prop Type': '',
+        'Side': '',
+        'Line': '',
+        'Actual Stat': '',
+        'Result': f'{total_under}/{total_results}, {under_percentage:.2%} Under',
+        'Odds': '',
+        'Bookmaker': ''
+    }
+
+    # Append totals rows to the dataframe
+    return pd.concat([comparison_df, pd.DataFrame([totals_over_row, totals_under_row])], ignore_index=True)
+
+# Class for O(1) lookups of a player's stats, merged across the categories the player appears in.
+# Players are keyed by ESPN athlete id when the stats have one, otherwise by name and team.
+class PlayerStatIndex:
+    def __init__(self, stats_data, stat_columns=None):
+        import pandas as pd
+
+        stat_columns = [column for column in (stat_columns or STAT_COLUMNS) if column in stats_data.columns]
+        names = stats_data['Player']
+        teams = stats_data['Team'].astype(object) if 'Team' in stats_data.columns else pd.Series(None, index=stats_data.index, dtype=object)
+
+        # Without an athlete id, the same name on two teams is two players
+        keys = names.astype(object).where(teams.isna(), names.astype(object) + " (" + teams + ")")
+        if 'Athlete ID' in stats_data.columns:
+            keys = stats_data['Athlete ID'].astype(object).where(stats_data['Athlete ID'].notna(), keys)
+        keys = keys.rename('Key')
+
+        # First non-null value of each stat over all of a player's rows
+        if stat_columns:
+            merged = stats_data[stat_columns].groupby(keys, sort=False).first()
+            self.values = merged.stack().rename('Actual Stat')
+        else:
+            self.values = pd.Series([], dtype=float, name='Actual Stat', index=pd.MultiIndex.from_tuples([], names=['Key', None]))
+        self.values.index = self.values.index.set_names(['Key', 'Stat'])
+        self._lookup = self.values.to_dict()
+        self._stats_by_key = {}  # Key -> {stat: value}, so a player's stats are one dict lookup
+        for (key, stat), value in self._lookup.items():
+            self._stats_by_key.setdefault(key, {})[stat] = value
+
+        # A name can belong to several athletes (e.g. on different teams)
+        self.keys_by_name = {}
+        self.teams = {}  # Key -> team of the player
+        for name, key, team in dict.fromkeys(zip(names.astype(object), keys, teams)):
+            if isinstance(team, str):
+                self.teams.setdefault(key, team)
+            if isinstance(name, str):
+                entries = self.keys_by_name.setdefault(name, [])
+                if key not in [entry[0] for entry in entries]:
+                    entries.append((key, normalize_team(team) if isinstance(team, str) else None))
+
+    # Function to get the key of a player, using the event's teams to pick between players with the same name.
+    # When the teams are known, a player on another team is a namesake from a different game, so it is no match.
+    def key_for(self, player, teams=()):
+        entries = self.keys_by_name.get(player) if isinstance(player, str) else None
+        if not entries:
+            return None
+        if not teams:
+            return entries[0][0]
+        for key, team in entries:
+            if team in teams:
+                return key
+        # Players without a team (e.g. a stats sheet without a Team column) can still be the one
+        for key, team in entries:
+            if team is None:
+                return key
+        return None
+
+    def get(self, key, stat):
+        return self._lookup.get((key, stat))
+
+    # Function to get all stats of a player as a dict
+    def player_stats(self, player, teams=()):
+        key = self.key_for(player, teams)
+        if key is None:
+            return {}
+        return dict(self._stats_by_key.get(key, {}))
+
+    # Function to get the index as a (Key, Stat, Actual Stat) frame for joins
+    def frame(self):
+        return self.values.reset_index()
+
+# Original row-by-row comparison, kept to cross-check the vectorized path
+def compare_props_iterrows(props_data, stats_data, stat_mapping=STAT_MAPPING, index=None):
+    import pandas as pd
+
+    if index is None:
+        index = PlayerStatIndex(stats_data, list(dict.fromkeys(stat_mapping.values())))
+    comparison_results = []
+
+    for _, prop_row in props_data.iterrows():
+        event = prop_row['Event']
+        player = prop_row['Player']
+        market = prop_row['Market']
+        prop_type = market  # Using the market as the prop type
+        line = prop_row['Line']
+        odds = prop_row['Odds']
+        side = prop_row.get('Prop')
+        bookmaker = prop_row.get('Bookmaker')
+
+        # Check if the prop type exists in the mapping
+        stat_column = stat_mapping.get(prop_type)
+        if not stat_column:
+            print(f"No matching stat type for prop: {prop_type}")
+            continue
+
+        # Find matching player in the stats data
+        player_key = index.key_for(player, teams_from_event(event))
+
+        # Skip if no matching player found
+        if player_key is None:
+            print(f"No matching stats found for player: {player}")
+            continue
+
+        # Retrieve the actual stat for the player based on the mapped column
+        actual_stat = index.get(player_key, stat_column)
+        team = index.teams.get(player_key)
+
+        # Compare stats and determine if over/under hit
+        if actual_stat is not None and pd.notnull(actual_stat) and pd.notnull(line):
+            try:
+                actual_stat_value = float(actual_stat)
+                line_value = float(line)
+            except ValueError:
+                actual_stat_value = None
+                line_value = None
+
+            if actual_stat_value is not None and line_value is not None:
+                if actual_stat_value > line_value:
+                    result = 'Over'
+                elif actual_stat_value < line_value:
+                    result = 'Under'
+                else:
+                    result = 'Push'
+
+                comparison_results.append({
+                    'Event': event,
+                    'Player': player,
+                    'Team': team,
+                    'Prop Type': prop_type,
+                    'Side': side,
+                    'Line': line_value,
+                    'Actual Stat': actual_stat_value,
+                    'Result': result,
+                    'Odds': odds,
+                    'Bookmaker': bookmaker
+                })
+            else:
+                comparison_results.append({
+                    'Event': event,
+                    'Player': player,
+                    'Team': team,
+                    'Prop Type': prop_type,
+                    'Side': side,
+                    'Line': line,
+                    'Actual Stat': actual_stat,
+                    'Result': 'No Data',
+                    'Odds': odds,
+                    'Bookmaker': bookmaker
+                })
+        else:
+            # For missing stats, assume 'No Data'
+            comparison_results.append({
+                'Event': event,
+                'Player': player,
+                'Team': team,
+                'Prop Type': prop_type,
+                'Side': side,
+                'Line': line,
+                'Actual Stat': actual_stat,
+                'Result': 'No Data',
+                'Odds': odds,
+                'Bookmaker': bookmaker
+            })
+    
+    # Create DataFrame for the comparison results
+    return pd.DataFrame(comparison_results, columns=COMPARISON_COLUMNS)
+
+# Vectorized comparison: joins props to each player's stats on (player, mapped stat)
+def compare_props_vectorized(props_data, stats_data, stat_mapping=STAT_MAPPING, index=None):
+    import pandas as pd
+
+    if index is None:
+        index = PlayerStatIndex(stats_data, list(dict.fromkeys(stat_mapping.values())))
+    # Side and bookmaker are optional (e.g. hand-made props sheets)
+    props = props_data.reindex(columns=['Event', 'Player', 'Market', 'Line', 'Odds', 'Prop', 'Bookmaker'])
+    props['Stat'] = props['Market'].astype(object).map(stat_mapping)
+    for market in props.loc[props['Stat'].isna(), 'Market'].unique():
+        print(f"No matching stat type for prop: {market}")
+    props = props[props['Stat'].notna()]
+
+    # Find each player's key once per (player, event), props for players without stats are skipped
+    pairs = list(zip(props['Player'], props['Event']))
+    keys = {pair: index.key_for(pair[0], teams_from_event(pair[1])) for pair in dict.fromkeys(pairs)}
+    props['Key'] = [keys.get(pair) for pair in pairs]
+    known_players = props['Key'].notna()
+    for player in props.loc[~known_players, 'Player'].unique():
+        print(f"No matching stats found for player: {player}")
+    props = props[known_players]
+
+    # Join on (player key, stat) against the index, which merges the player's categories
+    merged = props.merge(index.frame(), on=['Key', 'Stat'], how='left')
+
+    line_values, actual_values, comparable, result = evaluate_props(merged['Line'], merged['Actual Stat'])
+
+    comparison_df = pd.DataFrame({
+        'Event': merged['Event'],
+        'Player': merged['Player'],
+        'Team': merged['Key'].map(index.teams),
+        'Prop Type': merged['Market'],
+        'Side': merged['Prop'],
+        'Line': line_values.where(comparable, merged['Line']),
+        'Actual Stat': actual_values.where(comparable, merged['Actual Stat']),
+        'Result': result,
+        'Odds': merged['Odds'],
+        'Bookmaker': merged['Bookmaker']
+    }, columns=COMPARISON_COLUMNS)
+    return comparison_df.reset_index(drop=True)
+
+# Function to grade props: Over/Under/Push where both values are numeric, otherwise No Data.
+# Returns the numeric lines and actual stats, which rows were comparable and the results.
+def evaluate_props(lines, actuals):
+    import numpy as np
+    import pandas as pd
+
+    line_values = pd.to_numeric(lines, errors='coerce')
+    actual_values = pd.to_numeric(actuals, errors='coerce')
+    comparable = (line_values.notna() & actual_values.notna()).to_numpy()
+    line_array = line_values.to_numpy(dtype=float)
+    actual_array = actual_values.to_numpy(dtype=float)
+    result = np.select(
+        [comparable & (actual_array > line_array), comparable & (actual_array < line_array), comparable],
+        ['Over', 'Under', 'Push'],
+        default='No Data'
+    )
+    return line_values, actual_values, comparable, result
+
+# Function to check that both comparison paths give the same results
+def cross_check_compare(props_data, stats_data):
+    import pandas as pd
+
+    index = PlayerStatIndex(stats_data, list(dict.fromkeys(STAT_MAPPING.values())))
+    expected = compare_props_iterrows(props_data, stats_data, index=index)
+    actual = compare_props_vectorized(props_data, stats_data, index=index)
+    pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+    return len(actual)
+
+# Function to write the comparison with Over rows in green and Under rows in red. The totals rows
+# (see add_totals_rows) follow a blank row and are bold.
+def write_comparison_sheet(workbook, dataframe, sheet_name="Comparison"):
+    from itertools import chain
+
+    totals = (dataframe['Event'] == 'Totals').to_numpy()
+    totals_format = workbook.add_format({'bold': True})
+    rows = chain(frame_rows(dataframe[~totals]), [()] if totals.any() else [], frame_rows(dataframe[totals]))
+    worksheet, last_row = write_sheet(
+        workbook, sheet_name, list(dataframe.columns), rows, frame_widths(dataframe),
+        header_format={'bold': True, 'bg_color': '#D7E4BC', 'border': 1},
+        row_format=lambda values: totals_format if values and values[0] == 'Totals' else None
+    )
+
+    # Apply conditional formatting to 'Result' column
+    over_format = workbook.add_format({'bg_color': '#C6EFCE'})  # Light green
+    under_format = workbook.add_format({'bg_color': '#FFC7CE'})  # Light red
+    result_col_index = dataframe.columns.get_loc('Result')
+    worksheet.conditional_format(1, result_col_index, max(last_row, 1), result_col_index, {
+        'type': 'text',
+        'criteria': 'containing',
+        'value': 'Over',
+        'format': over_format
+    })
+    worksheet.conditional_format(1, result_col_index, max(last_row, 1), result_col_index, {
+        'type': 'text',
+        'criteria': 'containing',
+        'value': 'Under',
+        'format': under_format
+    })
+    return worksheet, last_row
+
+def save_comparison_to_excel(dataframe, filename):
+    with atomic_workbook(filename) as workbook:
+        write_comparison_sheet(workbook, dataframe)
+    print(f"Data saved to {filename}")
+
+# Settings for the season hit-rate rollups. Each week's comparison is reduced to counts per market,
+# bookmaker and player once, when it is stored, so season queries only add up the small weekly rollups.
+ROLLUP_DIMENSIONS = ["Season", "Season Type", "Week", "Market", "Bookmaker", "Player", "Team"]
+ROLLUP_COUNTS = ["Props", "Graded", "Overs", "Unders", "Pushes", "Margin Sum", "Bets", "Wins", "Profit"]
+HIT_RATE_TABLES = {
+    "Summary": ["Market"],
+    "Bookmakers": ["Bookmaker"],
+    "Players": ["Player", "Team"],
+    "Teams": ["Team"],
+    "Weeks": ["Season", "Season Type", "Week"],
+}
+
+def rollup_partition_path(year, week, seasontype=2, data_dir=DATA_DIR):
+    return os.path.join(data_dir, "rollups", f"season={year}", f"seasontype={seasontype}", f"week={week:02d}", "rollup.parquet")
+
+# Function to list the (year, seasontype, week, path) of the week partitions under a table of the data store
+def list_week_partitions(table, filename, data_dir=DATA_DIR, year=None, seasontype=None):
+    partitions = []
+    table_dir = os.path.join(data_dir, table)
+    for season_dir in sorted(os.listdir(table_dir)) if os.path.isdir(table_dir) else []:
+        if not season_dir.startswith("season=") or (year is not None and season_dir != f"season={year}"):
+            continue
+        for type_dir in sorted(os.listdir(os.path.join(table_dir, season_dir))):
+            if not type_dir.startswith("seasontype=") or (seasontype is not None and type_dir != f"seasontype={seasontype}"):
+                continue
+            for week_dir in sorted(os.listdir(os.path.join(table_dir, season_dir, type_dir))):
+                path = os.path.join(table_dir, season_dir, type_dir, week_dir, filename)
+                if week_dir.startswith("week=") and os.path.exists(path):
+                    partitions.append((int(season_dir[7:]), int(type_dir[11:]), int(week_dir[5:]), path))
+    return partitions
+
+# Function to reduce a week's comparison to counts that add up over weeks. Bets are flat 1 unit stakes on
+# each graded prop with a side and odds, a push returns the stake.
+def build_week_rollup(comparison_df, year, week, seasontype=2):
+    import numpy as np
+    import pandas as pd
+
+    df = comparison_df.reindex(columns=COMPARISON_COLUMNS)
+    df = df[df['Event'] != 'Totals']
+    result = df['Result'].astype(object)
+    graded = result.isin(['Over', 'Under', 'Push'])
+    side = df['Side'].astype(object)
+    decimal_odds = american_to_decimal(pd.to_numeric(df['Odds'], errors='coerce'))
+    bets = graded & side.isin(['Over', 'Under']) & ~np.isnan(decimal_odds)
+    wins = bets & (result == side)
+    losses = bets & result.isin(['Over', 'Under']) & (result != side)
+    margin = pd.to_numeric(df['Actual Stat'], errors='coerce') - pd.to_numeric(df['Line'], errors='coerce')
+
+    counts = pd.DataFrame({
+        'Season': year,
+        'Season Type': seasontype,
+        'Week': week,
+        'Market': df['Prop Type'].astype(object),
+        'Bookmaker': df['Bookmaker'].astype(object),
+        'Player': df['Player'].astype(object),
+        'Team': df['Team'].astype(object),
+        'Props': 1,
+        'Graded': graded,
+        'Overs': result == 'Over',
+        'Unders': result == 'Under',
+        'Pushes': result == 'Push',
+        'Margin Sum': margin.where(graded, 0.0),
+        'Bets': bets,
+        'Wins': wins,
+        'Profit': np.where(wins, decimal_odds - 1, np.where(losses, -1.0, 0.0)),
+    }, index=df.index)
+    rollup = counts.groupby(ROLLUP_DIMENSIONS, sort=False, dropna=False, as_index=False)[ROLLUP_COUNTS].sum()
+    return rollup.astype({column: "int32" for column in ROLLUP_COUNTS if column not in ("Margin Sum", "Profit")})
+
+def save_week_rollup(comparison_df, year, week, seasontype=2, data_dir=DATA_DIR):
+    return write_partition(build_week_rollup(comparison_df, year, week, seasontype), rollup_partition_path(year, week, seasontype, data_dir))
+
+# Function to build the rollups of stored comparisons that have none yet or changed since (e.g. compared
+# before the rollups existed), returns how many weeks were rolled up
+def update_rollups(data_dir=DATA_DIR, year=None, seasontype=None):
+    updated = 0
+    for season, season_type, week, path in list_week_partitions("comparison", "comparison.parquet", data_dir, year, seasontype):
+        rollup_path = rollup_partition_path(season, week, season_type, data_dir)
+        if not os.path.exists(rollup_path) or os.path.getmtime(rollup_path) < os.path.getmtime(path):
+            save_week_rollup(read_partition(path), season, week, season_type, data_dir)
+            updated += 1
+    return updated
+
+def load_rollups(data_dir=DATA_DIR, year=None, seasontype=None):
+    import pandas as pd
+
+    frames = [read_partition(path) for _, _, _, path in list_week_partitions("rollups", "rollup.parquet", data_dir, year, seasontype)]
+    if not frames:
+        return pd.DataFrame(columns=ROLLUP_DIMENSIONS + ROLLUP_COUNTS).astype({column: float for column in ROLLUP_COUNTS})
+    return pd.concat(frames, ignore_index=True)
+
+# Function to add up rollups by the given columns into hit rate (how often the Over hit, pushes left out as
+# in the totals rows), push rate, average margin (actual stat - line) and the realized return of the bets
+def hit_rates(rollups, by):
+    table = rollups.groupby(by, sort=True, dropna=False)[ROLLUP_COUNTS].sum()
+    decided = table['Overs'] + table['Unders']
+    table['Hit Rate'] = table['Overs'] / decided.where(decided > 0)
+    table['Push Rate'] = table['Pushes'] / table['Graded'].where(table['Graded'] > 0)
+    table['Avg Margin'] = table['Margin Sum'] / table['Graded'].where(table['Graded'] > 0)
+    table['ROI'] = table['Profit'] / table['Bets'].where(table['Bets'] > 0)
+    return table.drop(columns=['Margin Sum']).reset_index()
+
+# Function to get the hit-rate tables of a season (or every stored season), rolling up new comparisons first
+def season_hit_rates(year=None, seasontype=None, data_dir=DATA_DIR, tables=HIT_RATE_TABLES):
+    with measure("rollup"):
+        update_rollups(data_dir, year, seasontype)
+    with measure("load"):
+        rollups = load_rollups(data_dir, year, seasontype)
+    with measure("compare"):
+        return {name: hit_rates(rollups, by) for name, by in tables.items()}
+
+@instrumented_run("summary", "year", "seasontype")
+def export_season_hit_rates(year=None, seasontype=None, data_dir=DATA_DIR, filename=None):
+    tables = season_hit_rates(year, seasontype, data_dir)
+    if tables["Summary"].empty:
+        print("No comparisons found in the data store")
+        return tables
+    if filename is None:
+        filename = f"NFL_{year or 'All'}_Hit_Rates.xlsx"
+    with measure("export"):
+        save_hit_rates_to_excel(tables, filename)
+    return tables
+
+def write_hit_rates_sheet(workbook, sheet_name, table):
+    return write_rates_sheet(workbook, sheet_name, table, percent_columns=('Hit Rate', 'Push Rate', 'ROI'), decimal_columns=('Avg Margin', 'Profit'))
+
+def save_hit_rates_to_excel(tables, filename):
+    with atomic_workbook(filename) as workbook:
+        for sheet_name, table in tables.items():
+            write_hit_rates_sheet(workbook, sheet_name, table)
+    print(f"Data saved to {filename}")
+
+# Function to export a week into one workbook with a sheet each for its stats, props, comparison and the
+# season's hit rates by market. Sheets without data in the store are left out.
+@instrumented_run("export", "year", "week", "seasontype")
+def export_week_workbook(year, week, seasontype=2, data_dir=DATA_DIR, filename=None):
+    if filename is None:
+        filename = f"NFL_{year}_Week_{week}.xlsx"
+    stats_path = stats_partition_path(year, week, seasontype, data_dir)
+    comparison_path = comparison_partition_path(year, week, seasontype, data_dir)
+
+    with measure("export"):
+        # The data is read first, so an existing file is left alone when there is nothing to export
+        sheets = []
+        if os.path.exists(stats_path):
+            sheets.append((write_stats_sheet, read_partition(stats_path).dropna(axis=1, how="all")))
+        props_data = props_as_of(None, data_dir, year, week)
+        if not props_data.empty:
+            sheets.append((write_props_sheet, props_data.reindex(columns=PROPS_COLUMNS)))
+        if os.path.exists(comparison_path):
+            sheets.append((write_comparison_sheet, add_totals_rows(read_partition(comparison_path))))
+        summary = season_hit_rates(year, seasontype, data_dir)["Summary"]
+        if not summary.empty:
+            sheets.append((lambda workbook, data: write_hit_rates_sheet(workbook, "Season Summary", data), summary))
+        if not sheets:
+            print(f"No data found for week {week} of {year}")
+            return None
+
+        with atomic_workbook(filename) as workbook:
+            for write_sheet, data in sheets:
+                write_sheet(workbook, data)
+
+    print(f"Data saved to {filename}")
+    return filename
+
+# Settings for live polling during games
+LIVE_POLL_INTERVAL = 30  # Seconds between polls while games are in progress
+LIVE_MAX_INTERVAL = 120  # Polls back off up to this while nothing changes (e.g. at halftime)
+LIVE_IDLE_INTERVAL = 15 * 60  # Longest wait between polls before the first kickoff
+LIVE_BACKOFF = 1.5  # Factor the interval grows by after a poll without changes
+
+# Function to get the live state of a scoreboard event, the signature changes whenever the game moves on
+def get_game_state(event):
+    status = event.get('status', {})
+    competitors = event['competitions'][0]['competitors']
+    scores = tuple(str(team.get('score', '')) for team in sorted(competitors, key=lambda team: team['homeAway']))
+    state = status.get('type', {}).get('state') or ("post" if is_status_final(status) else "pre")
+    return {
+        "state": state,
+        "kickoff": event.get('date'),
+        "signature": (state, status.get('period'), status.get('displayClock'), scores),
+    }
+
+# Function for a conditional GET (If-None-Match/If-Modified-Since) that reuses the previous body on 304.
+# validators maps each URL to (etag, last_modified, data). Returns (data, changed, ok), ok is False when the
+# request failed and data is only the previous body (None if there was none).
+def fetch_if_changed(session, url, validators, timeout=REQUEST_TIMEOUT):
+    import requests
+
+    headers = {}
+    etag, last_modified, data = validators.get(url, (None, None, None))
+    if data is not None:
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    try:
+        response = session.get(url, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        record_request("espn")
+        print(f"Failed to retrieve {url}: {e}")
+        return data, False, False
+    record_request("espn", response)
+
+    if response.status_code == 304 and data is not None:
+        return data, False, True
+    if response.status_code != 200:
+        print(f"Failed to retrieve {url}: {response.status_code}")
+        return data, False, False
+    data = response.json()
+    validators[url] = (response.headers.get("ETag"), response.headers.get("Last-Modified"), data)
+    return data, True, True
+
+# Function to pick the wait before the next poll: fast while games change, slower while they
+# stand still, and up to LIVE_IDLE_INTERVAL before the first kickoff
+def next_poll_interval(states, games_changed, previous, now=None):
+    if any(state["state"] == "in" for state in states):
+        if games_changed:
+            return LIVE_POLL_INTERVAL
+        return min(previous * LIVE_BACKOFF, LIVE_MAX_INTERVAL)
+
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    kickoffs = [parse_commence_time(state["kickoff"]) for state in states if state["state"] == "pre" and state["kickoff"]]
+    if kickoffs:
+        wait = (min(kickoffs) - now).total_seconds()
+        return max(LIVE_POLL_INTERVAL, min(wait, LIVE_IDLE_INTERVAL))
+    return LIVE_MAX_INTERVAL
+
+def live_player_key(row):
+    return row.athlete_id or f"{row.player} ({row.team})"
+
+# Class for a week's slate during games: keeps the stats table and the graded props up to date,
+# refetching only games that moved on and regrading only the props of players whose stats changed
+class LiveSlate:
+    def __init__(self, year, week, props_data, seasontype=2, session=None, timeout=REQUEST_TIMEOUT, base_url=ESPN_BASE_URL, max_workers=MAX_WORKERS, resolve_names=None):
+        self.year = year
+        self.week = week
+        self.seasontype = seasontype
+        self.session = session
+        self.timeout = timeout
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.resolve_names = RESOLVE_PLAYER_NAMES if resolve_names is None else resolve_names
+
+        self.validators = {}  # URL -> (etag, last_modified, data) for conditional requests
+        self.states = {}  # Game ID -> state from the last scoreboard
+        self.patched = {}  # Game ID -> signature of the state its stats were last patched at
+        self.rows = {}  # (game ID, team, category, player key) -> StatRow, the stats table
+        self.game_rows = {}  # Game ID -> keys of its rows
+        self.player_stats = {}  # Player key -> {stat column: value} merged over categories
+        self.players = {}  # Player key -> (name, team)
+        self.polls = 0
+
+        # One row per prop with a mapped stat, the player key is filled in once the player shows up
+        props = props_data.reindex(columns=['Event', 'Player', 'Market', 'Line', 'Odds', 'Prop', 'Bookmaker'])
+        props['Stat'] = props['Market'].astype(object).map(STAT_MAPPING)
+        props = props[props['Stat'].notna()].reset_index(drop=True)
+        props['Name'] = props['Player']  # Name the player is known by in the stats
+        props['Key'] = None
+        props['Actual Stat'] = None
+        props['Result'] = 'No Data'
+        self.props = props
+
+    def poll(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.polls += 1
+        url = f"{self.base_url}/scoreboard?dates={self.year}&seasontype={self.seasontype}&week={self.week}"
+        with measure("fetch"):
+            scoreboard_data, _, _ = fetch_if_changed(self.session, url, self.validators, self.timeout)
+        if scoreboard_data is None:
+            raise Exception("Failed to retrieve the scoreboard")
+
+        # Games whose status, period, clock or score moved since their stats were last patched.
+        # A game whose summary failed or lagged the scoreboard stays in the list until it is patched.
+        infos = {info["id"]: info for info in get_game_infos(scoreboard_data)}
+        changed_games = []
+        for event in scoreboard_data.get('events', []):
+            state = get_game_state(event)
+            self.states[event['id']] = state
+            if state["state"] != "pre" and self.patched.get(event['id']) != state["signature"]:
+                changed_games.append(event['id'])
+
+        changed_players = set()
+        new_players = False
+        if changed_games:
+            with measure("fetch"):
+                with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(changed_games)))) as executor:
+                    futures = [
+                        submit_in_context(executor, fetch_if_changed, self.session, f"{self.base_url}/summary?event={game_id}", self.validators, self.timeout)
+                        for game_id in changed_games
+                    ]
+                    summaries = [future.result() for future in futures]
+            with measure("parse"):
+                for game_id, (summary_data, summary_changed, summary_ok) in zip(changed_games, summaries):
+                    if summary_data is None:
+                        continue
+                    if summary_changed:
+                        players_before = len(self.players)
+                        changed_players |= self.patch_game(game_id, infos[game_id], summary_data)
+                        new_players = new_players or len(self.players) != players_before
+                    # Failed requests are retried next poll. The scoreboard moved on for every game here, so a
+                    # 304 mid-game is a summary lagging behind it, and a final game's stats are only complete
+                    # once its summary is final too.
+                    state = self.states[game_id]
+                    if not summary_ok:
+                        continue
+                    if is_summary_final(summary_data) if state["state"] == "post" else summary_changed:
+                        self.patched[game_id] = state["signature"]
+
+        with measure("compare"):
+            if new_players:
+                changed_players |= self.match_props()
+            props_updated = self.grade(changed_players)
+
+        states = list(self.states.values())
+        pending = self.pending_games()
+        return {
+            "poll": self.polls,
+            "games_changed": len(changed_games),
+            "players_changed": len(changed_players),
+            "props_updated": props_updated,
+            "in_progress": sum(state["state"] == "in" for state in states),
+            "pending": len(pending),
+            "final": bool(states) and all(state["state"] == "post" for state in states) and not pending,
+        }
+
+    # Function to get the games that started but whose stats are not patched up to their latest state
+    def pending_games(self):
+        return [game_id for game_id, state in self.states.items() if state["state"] != "pre" and self.patched.get(game_id) != state["signature"]]
+
+    # Function to patch a game's rows into the stats table, returns the keys of players whose rows changed
+    def patch_game(self, game_id, info, summary_data):
+        new_rows = {}
+        rows_by_player = {}
+        for row in iter_summary_rows(info, summary_data):
+            player_key = live_player_key(row)
+            key = (game_id, row.team, row.category, player_key)
+            new_rows[key] = row
+            rows_by_player.setdefault(player_key, []).append(key)
+
+        changed = set()
+        for key, row in new_rows.items():
+            old = self.rows.get(key)
+            if old is None or old.values != row.values:
+                self.rows[key] = row
+                changed.add(key[3])
+            else:
+                old.home_score, old.away_score = row.home_score, row.away_score
+        for key in self.game_rows.get(game_id, set()) - new_rows.keys():
+            del self.rows[key]
+            changed.add(key[3])
+        self.game_rows[game_id] = set(new_rows)
+
+        # First non-empty value of each stat over the player's categories, as in PlayerStatIndex
+        for player_key in changed:
+            merged = {}
+            for key in rows_by_player.get(player_key, ()):
+                row = self.rows[key]
+                self.players[player_key] = (row.player, row.team)
+                for column, value in zip(STAT_CATEGORY_COLUMNS.get(row.category, ()), row.values):
+                    if value is not None and column not in merged:
+                        merged[column] = value
+            self.player_stats[player_key] = merged
+        return changed
+
+    # Function to find the player of props that have none yet, returns the keys of newly matched players
+    def match_props(self):
+        import pandas as pd
+
+        unmatched = self.props['Key'].isna()
+        if not unmatched.any():
+            return set()
+        players = pd.DataFrame(
+            [(name, team, key) for key, (name, team) in self.players.items()],
+            columns=['Player', 'Team', 'Key']
+        )
+        names = self.props.loc[unmatched, 'Player']
+        events = self.props.loc[unmatched, 'Event']
+        if self.resolve_names:
+            resolver = PlayerNameResolver(players)
+            names = resolver.resolve_series(names, events)
+            resolver.save()
+
+        # Only match players of the event's teams, a namesake elsewhere may just not have played yet
+        index = PlayerStatIndex(players.rename(columns={'Key': 'Athlete ID'}), [])
+        pairs = list(zip(names, events))
+        keys = {}
+        for name, event in dict.fromkeys(pairs):
+            teams = teams_from_event(event)
+            keys[(name, event)] = index.key_for(name, teams)
+        self.props.loc[unmatched, 'Name'] = names.to_numpy()
+        self.props.loc[unmatched, 'Key'] = [keys[pair] for pair in pairs]
+        return {key for key in keys.values() if key is not None}
+
+    # Function to regrade the props of the given players, returns how many props were regraded
+    def grade(self, player_keys):
+        import pandas as pd
+
+        if not player_keys:
+            return 0
+        mask = self.props['Key'].isin(player_keys).to_numpy()
+        if not mask.any():
+            return 0
+        subset = self.props.loc[mask, ['Key', 'Stat', 'Line']]
+        actuals = pd.Series([self.player_stats.get(key, {}).get(stat) for key, stat in zip(subset['Key'], subset['Stat'])], index=subset.index, dtype=object)
+        _, actual_values, _, result = evaluate_props(subset['Line'], actuals)
+        self.props.loc[mask, 'Actual Stat'] = actual_values.to_numpy()
+        self.props.loc[mask, 'Result'] = result
+        return int(mask.sum())
+
+    # Function to get the graded props of players that have stats, in the comparison layout
+    def comparison(self):
+        import pandas as pd
+
+        props = self.props[self.props['Key'].notna()]
+        return pd.DataFrame({
+            'Event': props['Event'],
+            'Player': props['Name'],
+            'Team': [self.players[key][1] for key in props['Key']],
+            'Prop Type': props['Market'],
+            'Side': props['Prop'],
+            'Line': pd.to_numeric(props['Line'], errors='coerce'),
+            'Actual Stat': pd.to_numeric(props['Actual Stat'], errors='coerce'),
+            'Result': props['Result'],
+            'Odds': props['Odds'],
+            'Bookmaker': props['Bookmaker']
+        }, columns=COMPARISON_COLUMNS).reset_index(drop=True)
+
+    def result_counts(self):
+        return self.props.loc[self.props['Key'].notna(), 'Result'].value_counts().to_dict()
+
+    # Function to write the stats table and the comparison to the data store
+    def save(self, data_dir=DATA_DIR):
+        stats_path = stats_partition_path(self.year, self.week, self.seasontype, data_dir)
+        row_count, _ = write_stats_rows(list(self.rows.values()), stats_path)
+        comparison_df = self.comparison()
+        comparison_path = write_partition(type_comparison_frame(comparison_df), comparison_partition_path(self.year, self.week, self.seasontype, data_dir))
+        save_week_rollup(comparison_df, self.year, self.week, self.seasontype, data_dir)
+        return (stats_path if row_count else None), comparison_path
+
+# Function to follow a week live until every game is final (or stop_event is set), regrading props as stats come in.
+# on_update(slate, update) is called after each poll, e.g. to refresh a display.
+@instrumented_run("live", "year", "week", "seasontype")
+def run_live(year, week, seasontype=2, props_path=None, data_dir=DATA_DIR, on_update=None, stop_event=None, max_polls=None, export_excel=None, session=None, base_url=ESPN_BASE_URL):
+    props_data = load_week_props(year, week, props_path, data_dir=data_dir)
+
+    stop_event = stop_event or threading.Event()
+    own_session = session is None
+    if own_session:
+        session = create_session(MAX_WORKERS)
+    slate = LiveSlate(year, week, props_data, seasontype, session=session, base_url=base_url)
+    interval = LIVE_POLL_INTERVAL
+    try:
+        while not stop_event.is_set():
+            update = slate.poll()
+            if not slate.states:
+                print(f"No games found for week {week} of {year}")
+                break
+            counts = slate.result_counts()
+            interval = next_poll_interval(list(slate.states.values()), update["games_changed"], interval)
+            if update["pending"]:
+                interval = min(interval, LIVE_POLL_INTERVAL)  # Retry games whose summary failed soon
+            print(f"Poll {update['poll']}: {update['games_changed']} games changed, {update['players_changed']} players updated, "
+                  f"{update['props_updated']} props regraded ({', '.join(f'{result} {count}' for result, count in sorted(counts.items()))})"
+                  + ("" if update["final"] else f", next poll in {interval:.0f}s"))
+            if on_update is not None:
+                on_update(slate, update)
+            if update["final"] or (max_polls is not None and update["poll"] >= max_polls):
+                break
+            stop_event.wait(interval)
+    finally:
+        if own_session:
+            session.close()
+        if slate.rows:
+            stats_path, comparison_path = slate.save(data_dir)
+            print(f"Data saved to {stats_path}")
+            print(f"Comparison saved to {comparison_path}")
+
+    if export_excel is None:
+        export_excel = EXPORT_EXCEL
+    if export_excel and slate.rows:
+        filename = f"Player_Props_Comparison_Week_{week}.xlsx"
+        with measure("export"):
+            save_comparison_to_excel(add_totals_rows(slate.comparison()), filename)
+        print(f"Comparison saved to {filename}")
+    return slate
@@ -0,0 +1,36 @@
+# Regression tests for backfilling stats, on the synthetic fixtures of the benchmarks
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import fixtures
+import nfl_core
+
+def backfill(season, weeks, data_dir, monkeypatch):
+    monkeypatch.setattr(nfl_core, "CACHE_ENABLED", False)
+    monkeypatch.setattr(nfl_core, "create_session", lambda *args, **kwargs: season.session())
+    return nfl_core.backfill_nfl_stats([season.year], [fixtures.SEASONTYPE], weeks, data_dir=data_dir)
+
+# Weeks without games in a season that is over are done, so a rerun does not download them again
+def test_empty_weeks_of_past_seasons_are_done(tmp_path, monkeypatch):
+    season = fixtures.SyntheticSeason(games=32, bookmakers=2, year=2023)
+    checkpoint = backfill(season, [1, 2, 3], str(tmp_path), monkeypatch)
+    assert set(checkpoint) == {"2023-2-01", "2023-2-02", "2023-2-03"}
+    assert checkpoint["2023-2-03"]["empty"]
+
+    requests = []
+    monkeypatch.setattr(nfl_core, "get_nfl_week_stats", lambda *args, **kwargs: requests.append(args))
+    backfill(season, [1, 2, 3], str(tmp_path), monkeypatch)
+    assert requests == []
+
+# Weeks not played yet are downloaded again on the next run
+def test_unplayed_weeks_are_not_done(tmp_path, monkeypatch):
+    season = fixtures.SyntheticSeason(games=16, bookmakers=2, year=2100)
+    checkpoint = backfill(season, [1, 2], str(tmp_path), monkeypatch)
+    assert set(checkpoint) == {"2100-2-01"}
+
+# Seasons before 2021 had 17 regular season weeks
+def test_season_type_weeks():
+    assert list(nfl_core.season_type_weeks(2020, 2)) == list(range(1, 18))
+    assert list(nfl_core.season_type_weeks(2021, 2)) == list(range(1, 19))
@@ -0,0 +1,58 @@
+# Tests for the props/stats comparison, on the synthetic fixtures of the benchmarks
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import numpy as np
+import pandas as pd
+
+import fixtures
+import nfl_core
+
+def week_inputs(tmp_path, games=16):
+    season = fixtures.SyntheticSeason(games=games, bookmakers=3)
+    path = str(tmp_path / "stats.parquet")
+    season.write_week_stats(1, path)
+    props = pd.DataFrame(season.week_props(1), columns=nfl_core.PROPS_COLUMNS)
+    return props, nfl_core.read_partition(path)
+
+# The vectorized comparison gives the same results as the row-by-row one
+def test_cross_check_compare(tmp_path):
+    props, stats = week_inputs(tmp_path)
+    assert nfl_core.cross_check_compare(props, stats) > 0
+
+# Lines the feed leaves out ('N/A' or missing) and players without stats are graded the same on both paths
+def test_cross_check_compare_missing_lines(tmp_path):
+    props, stats = week_inputs(tmp_path)
+    props["Line"] = props["Line"].astype(object)
+    props.loc[props.index[::7], "Line"] = "N/A"
+    props.loc[props.index[3::11], "Line"] = np.nan
+    props.loc[props.index[5::13], "Player"] = "Nobody Known"
+    assert nfl_core.cross_check_compare(props, stats) > 0
+
+    comparison = nfl_core.build_comparison(props, stats, vectorized=True, resolve_names=False)
+    assert comparison["Line"].isna().sum() > 0
+    assert (comparison.loc[comparison["Line"].isna(), "Result"] == "No Data").all()
+    assert (comparison.loc[comparison["Player"] == "Nobody Known", "Result"] == "No Data").all()
+    assert {"Over", "Under"} <= set(comparison["Result"])
+
+# A namesake on a team outside the event is not the player the prop is for
+def test_namesake_from_another_game_is_not_matched(tmp_path):
+    stats = pd.DataFrame({
+        "Player": ["Mike Williams", "George Pickens"], "Team": ["New York Jets", "Pittsburgh Steelers"],
+        "Athlete ID": ["1", "2"], "Receptions": [7.0, 5.0],
+    })
+    props = pd.DataFrame({
+        "Event": ["Pittsburgh Steelers vs Baltimore Ravens"] * 2, "Bookmaker": ["DraftKings"] * 2,
+        "Market": ["player_receptions"] * 2, "Player": ["Mike Williams", "George Pickens"],
+        "Prop": ["Over"] * 2, "Line": [4.5, 4.5], "Odds": [-110, -110],
+    })
+    for vectorized in (True, False):
+        comparison = nfl_core.build_comparison(props, stats, vectorized=vectorized, resolve_names=False)
+        assert list(comparison["Player"]) == ["George Pickens"]
+        assert list(comparison["Result"]) == ["Over"]
+
+    resolver = nfl_core.PlayerNameResolver(stats, memo_path=None)
+    assert resolver.resolve("Mike Williams Jr.", props["Event"][0]) == "Mike Williams Jr."
+    assert resolver.resolve("Mike Williams Jr.", "New York Jets vs Buffalo Bills") == "Mike Williams"
@@ -0,0 +1,26 @@
+# Tests for exporting a week from the data store into one workbook
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import fixtures
+import nfl_core
+
+# A week without data in the store leaves an existing workbook of the same name alone
+def test_export_without_data_keeps_existing_file(tmp_path):
+    filename = tmp_path / "week.xlsx"
+    filename.write_bytes(b"earlier export")
+
+    assert nfl_core.export_week_workbook(fixtures.YEAR, 1, fixtures.SEASONTYPE, str(tmp_path / "nfl_data"), filename=str(filename)) is None
+    assert filename.read_bytes() == b"earlier export"
+
+def test_export_writes_the_weeks_stats(tmp_path):
+    season = fixtures.SyntheticSeason(games=2, bookmakers=2)
+    data_dir = str(tmp_path / "nfl_data")
+    season.write_week_stats(1, nfl_core.stats_partition_path(season.year, 1, fixtures.SEASONTYPE, data_dir))
+    filename = tmp_path / "week.xlsx"
+    filename.write_bytes(b"earlier export")
+
+    assert nfl_core.export_week_workbook(season.year, 1, fixtures.SEASONTYPE, data_dir, filename=str(filename)) == str(filename)
+    assert filename.read_bytes()[:2] == b"PK"
@@ -0,0 +1,118 @@
+# Regression tests for following a week live (LiveSlate), on the synthetic fixtures of the benchmarks
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import pandas as pd
+
+import fixtures
+import nfl_core
+
+# Fixture session whose game summaries fail with a 503 until recovered
+class FlakySummarySession(fixtures.FixtureSession):
+    def __init__(self, season):
+        super().__init__(season)
+        self.failing = True
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        if self.failing and "/summary" in url:
+            return fixtures.FixtureResponse(503, "Service Unavailable")
+        return super().get(url, params, timeout, headers)
+
+# Fixture session whose game summaries still show the games in progress until caught up
+class LaggingSummarySession(fixtures.FixtureSession):
+    def __init__(self, season):
+        super().__init__(season)
+        self.lagging = True
+
+    def espn_response(self, data, headers=None):
+        if self.lagging and "header" in data:
+            data = dict(data, header={"competitions": [{"status": {"type": {"completed": False}}}]})
+        return super().espn_response(data, headers)
+
+# Fixture session whose games are in progress: the scoreboard shows clock, the summaries show summary_clock
+# and fail with a 503 while failing
+class InProgressSession(fixtures.FixtureSession):
+    def __init__(self, season):
+        super().__init__(season)
+        self.clock = "15:00"
+        self.summary_clock = "15:00"
+        self.failing = False
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        if self.failing and "/summary" in url:
+            return fixtures.FixtureResponse(503, "Service Unavailable")
+        return super().get(url, params, timeout, headers)
+
+    def espn_response(self, data, headers=None):
+        if "events" in data:
+            status = {"type": {"completed": False, "state": "in"}, "period": 1, "displayClock": self.clock}
+            data = dict(data, events=[dict(event, status=status) for event in data["events"]])
+        elif "header" in data:
+            status = {"type": {"completed": False, "state": "in"}, "period": 1, "displayClock": self.summary_clock}
+            data = dict(data, header={"competitions": [{"status": status}]})
+        return super().espn_response(data, headers)
+
+# Games that go final while their summaries fail are fetched again, and the week is not final until they are patched
+def test_failed_summaries_are_retried_before_final():
+    season = fixtures.SyntheticSeason(games=4, bookmakers=2)
+    session = FlakySummarySession(season)
+    slate = nfl_core.LiveSlate(season.year, 1, pd.DataFrame(season.week_props(1), columns=nfl_core.PROPS_COLUMNS), fixtures.SEASONTYPE, session=session, resolve_names=False)
+
+    update = slate.poll()
+    assert not update["final"]
+    assert update["pending"] == 4
+    assert not slate.rows
+
+    session.failing = False
+    update = slate.poll()
+    assert update["final"]
+    assert update["games_changed"] == 4
+    assert update["pending"] == 0
+    assert slate.rows
+    assert update["props_updated"] > 0
+    assert set(slate.result_counts()) - {"No Data"}
+
+# A summary that lags the final scoreboard is fetched again once it is final too
+def test_lagging_summaries_are_refetched_once_final():
+    season = fixtures.SyntheticSeason(games=4, bookmakers=2)
+    session = LaggingSummarySession(season)
+    slate = nfl_core.LiveSlate(season.year, 1, pd.DataFrame(season.week_props(1), columns=nfl_core.PROPS_COLUMNS), fixtures.SEASONTYPE, session=session, resolve_names=False)
+
+    update = slate.poll()
+    assert not update["final"]
+    assert update["pending"] == 4
+
+    session.lagging = False
+    update = slate.poll()
+    assert update["final"]
+    assert update["games_changed"] == 4
+
+# In-progress games whose summaries fail, or lag the scoreboard with a 304, are fetched again next poll
+def test_in_progress_summaries_are_retried_until_current():
+    season = fixtures.SyntheticSeason(games=4, bookmakers=2)
+    session = InProgressSession(season)
+    slate = nfl_core.LiveSlate(season.year, 1, pd.DataFrame(season.week_props(1), columns=nfl_core.PROPS_COLUMNS), fixtures.SEASONTYPE, session=session, resolve_names=False)
+
+    update = slate.poll()
+    assert update["games_changed"] == 4
+    assert update["pending"] == 0
+    assert not update["final"]
+
+    session.clock = "12:30"
+    session.failing = True
+    update = slate.poll()
+    assert update["games_changed"] == 4
+    assert update["pending"] == 4
+
+    session.failing = False
+    update = slate.poll()
+    assert update["games_changed"] == 4
+    assert update["pending"] == 4
+
+    session.summary_clock = "12:30"
+    update = slate.poll()
+    assert update["games_changed"] == 4
+    assert update["pending"] == 0
+    assert not update["final"]
@@ -0,0 +1,61 @@
+# Tests for the odds math (implied and no-vig probabilities, consensus prices) on small hand-computed frames
+import numpy as np
+import pandas as pd
+import pytest
+
+import nfl_core
+
+# One player's passing yards at four bookmakers: a -110/-110 pair, a +100/-120 pair, an Over without an
+# Under at another line, and an Over without odds (so its Under has no pair)
+def odds_frame():
+    rows = [
+        ("E1", "Book1", "player_pass_yds", "Alex Arm", "Over", 250.5, -110),
+        ("E1", "Book1", "player_pass_yds", "Alex Arm", "Under", 250.5, -110),
+        ("E1", "Book2", "player_pass_yds", "Alex Arm", "Over", 250.5, 100),
+        ("E1", "Book2", "player_pass_yds", "Alex Arm", "Under", 250.5, -120),
+        ("E1", "Book3", "player_pass_yds", "Alex Arm", "Over", 249.5, -115),
+        ("E1", "Book4", "player_pass_yds", "Alex Arm", "Over", 250.5, np.nan),
+        ("E1", "Book4", "player_pass_yds", "Alex Arm", "Under", 250.5, -125),
+    ]
+    return pd.DataFrame(rows, columns=nfl_core.PROPS_COLUMNS)
+
+def test_american_to_probability():
+    probability = nfl_core.american_to_probability([-110, 150, -100, 100, 50, np.nan])
+    assert probability[:4] == pytest.approx([110 / 210, 100 / 250, 0.5, 0.5])
+    assert np.isnan(probability[4:]).all()
+
+def test_add_no_vig_probabilities_pairs_each_bookmakers_line():
+    props = nfl_core.add_no_vig_probabilities(odds_frame())
+    assert props["Implied Prob"].iloc[:5].tolist() == pytest.approx([110 / 210, 110 / 210, 0.5, 120 / 220, 115 / 215])
+
+    book1 = 2 * 110 / 210
+    book2 = 0.5 + 120 / 220
+    assert props["No-Vig Prob"].iloc[:4].tolist() == pytest.approx([0.5, 0.5, 0.5 / book2, (120 / 220) / book2])
+    assert props["Vig"].iloc[:4].tolist() == pytest.approx([book1 - 1, book1 - 1, book2 - 1, book2 - 1])
+    # No Under at Book3's line, no Over odds at Book4
+    assert props["No-Vig Prob"].iloc[4:].isna().all()
+    assert props["Vig"].iloc[4:].isna().all()
+
+def test_consensus_prices():
+    prices = nfl_core.consensus_prices(odds_frame()).set_index("Prop")
+    book2 = 0.5 + 120 / 220
+
+    over = prices.loc["Over"]
+    over_prob = (0.5 + 0.5 / book2) / 2
+    assert over["Consensus Line"] == 250.5
+    assert over["Books"] == 3
+    assert over["No-Vig Prob"] == pytest.approx(over_prob)
+    assert over["Avg Vig"] == pytest.approx((2 * 110 / 210 - 1 + book2 - 1) / 2)
+    assert over["Fair Odds"] == round(100 * (1 - over_prob) / over_prob)
+    assert over["Best Bookmaker"] == "Book2"
+    assert over["Best Odds"] == 100
+    assert over["EV"] == pytest.approx(over_prob * 2 - 1)
+
+    under = prices.loc["Under"]
+    under_prob = (0.5 + (120 / 220) / book2) / 2
+    assert under["Consensus Line"] == 250.5
+    assert under["No-Vig Prob"] == pytest.approx(under_prob)
+    assert under["Fair Odds"] == round(-100 * under_prob / (1 - under_prob))
+    assert under["Best Bookmaker"] == "Book1"
+    assert under["Best Odds"] == -110
+    assert under["EV"] == pytest.approx(under_prob * (1 + 100 / 110) - 1)
@@ -0,0 +1,57 @@
+# Regression tests for the prop line history, on the synthetic fixtures of the benchmarks
+import datetime
+import os
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import fixtures
+import nfl_core
+
+# Saves for two weeks at once (e.g. two props jobs in the GUI) both stay in the standing lines
+def test_concurrent_saves_keep_both_weeks(tmp_path):
+    season = fixtures.SyntheticSeason(games=32, bookmakers=2)
+    props = {week: season.week_props(week) for week in (1, 2)}
+    threads = [threading.Thread(target=nfl_core.save_props_snapshot, args=(props[week], str(tmp_path)), kwargs={"year": season.year, "week": week}) for week in props]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for week in props:
+        assert len(nfl_core.props_as_of(None, str(tmp_path), season.year, week)) == len(props[week])
+
+# A state that misses a snapshot (as left by a save overlapping another process's) is rebuilt from the changes
+def test_state_missing_a_snapshot_is_rebuilt(tmp_path):
+    season = fixtures.SyntheticSeason(games=32, bookmakers=2)
+    data_dir = str(tmp_path)
+    start = datetime.datetime(2024, 9, 1, tzinfo=datetime.timezone.utc)
+    week_1 = season.week_props(1)
+    nfl_core.save_props_snapshot(week_1, data_dir, when=start, year=season.year, week=1)
+
+    # Week 2 diffed against an empty history, as if week 1 was saved while it ran
+    other_dir = str(tmp_path / "other")
+    nfl_core.save_props_snapshot(season.week_props(2), other_dir, when=start + datetime.timedelta(minutes=1), year=season.year, week=2)
+    snapshot = nfl_core.list_prop_line_snapshots(other_dir)[0]
+    for path in (nfl_core.prop_lines_partition_path(snapshot, other_dir), nfl_core.prop_lines_state_path(snapshot, 1, other_dir)):
+        target = path.replace(other_dir, data_dir)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+
+    assert len(nfl_core.props_as_of(None, data_dir, season.year, 1)) == len(week_1)
+
+# A week without lines in the history has no stored props, even when a full snapshot of another week exists
+def test_week_without_lines_has_no_stored_props(tmp_path):
+    season = fixtures.SyntheticSeason(games=32, bookmakers=2)
+    data_dir = str(tmp_path)
+    nfl_core.write_partition(nfl_core.type_props_frame(pd.DataFrame(season.week_props(1), columns=nfl_core.PROPS_COLUMNS)), os.path.join(data_dir, "props", "snapshot=20240905T000000000000Z", "props.parquet"))
+    nfl_core.save_props_snapshot(season.week_props(1), data_dir, year=season.year, week=1)
+
+    assert nfl_core.has_stored_props(season.year, 1, data_dir)
+    assert not nfl_core.has_stored_props(season.year, 2, data_dir)
+    with pytest.raises(Exception, match="No props found"):
+        nfl_core.load_week_props(season.year, 2, data_dir=data_dir)